@@ -5,7 +5,7 @@ import pandas as pd
 import numpy as np
 import os
 import argparse
-from instance_generation import get_instance
+from instance_generation import get_instances
 
 from tqdm import tqdm
 from config import default_params, data_saving_path
@@ -80,12 +80,9 @@ def generate(params: dict, verbose=False, error_rate = 0) -> pd.DataFrame:
         print("Generating data...")
     p = len(profiles)
     n = len(weights)
-    data_list = []
-    # for _ in tqdm(range(n_generated)):
-    for _ in range(n_generated):
-        instance = get_instance(weights, profiles, lmbda, error_rate=error_rate)
-        data_list.append(instance)
-    data = pd.DataFrame(data_list, columns=['mark_' + str(i+1) for i in range(n)]+['class'])   
+    marks, classes = get_instances(weights, profiles, lmbda, n_generated, error_rate=error_rate)
+    data = pd.DataFrame(marks, columns=['mark_' + str(i+1) for i in range(n)])
+    data['class'] = classes
     return data
 
 def generate_save(params: dict, verbose=False, error_rate = 0):
@@ -1,8 +1,9 @@
 """
-This file contains the functions that generate the instances.
+This file contains the functions that classify and generate the instances.
 """
 
 import numpy as np
+from dataclasses import dataclass
 import pandas as pd
 from utils import value_quantization
 
@@ -13,27 +14,47 @@ def mr_sort_correction(
     weights = params['weights']
     profiles = params['profiles']
     lmbda = params['lmbda']
-    n_errors = 0
+    real_classes = mr_sort_classes(data.iloc[:, :-1].to_numpy(dtype=float), weights, profiles, lmbda)
+    n_errors = int(np.count_nonzero(real_classes != data.iloc[:, -1].to_numpy()))
     corrected_data = data.copy()
-    for i in range(len(data)):
-        marks = data.iloc[i, :-1]
-        _class = data.iloc[i, -1]
-        real_class = mr_sort(marks, weights, profiles, lmbda)
-        if real_class != _class:
-            n_errors += 1
-        corrected_data.iloc[i, -1] = real_class
+    corrected_data.iloc[:, -1] = real_classes
     
     return corrected_data, n_errors
 
 
 
+def mr_sort_classes(
+    X: np.ndarray, weights: list[float], profiles: list[list[float]], lmbda: float
+) -> np.ndarray:
+    """
+    Returns the classes of the instances by comparing to profiles, for all the instances at once
+    see the paragraph "2.1 MR-Sort" in:
+        https://hal.archives-ouvertes.fr/hal-01443088/document
+    An instance passes a profile if the weights of the criteria where its marks are at least the profile sum to
+    lambda or more, and its class is the number of profiles it passes before failing one. The weights are summed
+    criterion by criterion, in the order of mr_sort, so that the sums equal to lambda are compared alike.
+
+    Arguments:
+        X: np.array(float) -- marks of the instances (instances x criteria)
+        weights: list(int) -- list of weights
+        profiles: list(int) -- list of profiles
+        lmbda: int -- lambda value
+    Returns:
+        np.array(int) -- class of each instance
+    """
+    X = np.asarray(X, dtype=float)
+    profiles = np.asarray(profiles, dtype=float).reshape(-1, X.shape[1])
+    sum_weights = np.zeros((len(X), len(profiles)))  # (instances x profiles)
+    for j, weight in enumerate(weights):
+        sum_weights += (X[:, j, None] >= profiles[None, :, j]) * weight
+    return np.cumprod(sum_weights >= lmbda, axis=1).sum(axis=1)
+
+
 def mr_sort(
     marks: np.ndarray, weights: list[float], profiles: list[list[float]], lmbda: float
 ) -> int:
     """
-    Returns the class of the instance by comparing to profiles
-    see the paragraph "2.1 MR-Sort" in:
-        https://hal.archives-ouvertes.fr/hal-01443088/document
+    Returns the class of the instance by comparing to profiles, see mr_sort_classes
     
     Arguments:
         marks: np.array(float) -- list of marks
@@ -41,25 +62,79 @@ def mr_sort(
         profiles: list(int) -- list of profiles
         lmbda: int -- lambda value
     Returns:
-        np.array(float) -- class of the instance
+        int -- class of the instance
+    """
+    return int(mr_sort_classes(np.asarray(marks, dtype=float)[None, :], weights, profiles, lmbda)[0])
+
+
+@dataclass(frozen=True, eq=False)
+class MRSortModel:
+    """
+    Learnt MR-Sort model, with read-only arrays: it classifies the instances without the solver that learnt it.
+
+    Arguments:
+        profiles: np.array(float) -- profiles (profiles x criteria)
+        weights: np.array(float) -- weights of the criteria
+        lmbda: float -- lambda value
+    """
+    profiles: np.ndarray
+    weights: np.ndarray
+    lmbda: float
+
+    def __post_init__(self):
+        for name in ["profiles", "weights"]:
+            array = np.array(getattr(self, name), dtype=float)
+            array.setflags(write=False)
+            object.__setattr__(self, name, array)
+        object.__setattr__(self, "lmbda", float(self.lmbda))
+
+    def predict(self, X: np.ndarray) -> list:
+        """
+        Returns the class of each instance (rows of marks), see mr_sort_classes.
+        """
+        return mr_sort_classes(X, self.weights, self.profiles, self.lmbda).tolist()
+
+
+def get_instances(
+    weights: list[float], profiles: list[list[float]], lmbda: float, n_generated: int, std=2, error_rate = 0
+) -> tuple:
+    """
+    Generates instances (marks + classes) around the profiles, classified all at once.
+    The random draws are made instance by instance, in the order of successive get_instance calls, so that a seed gives
+    the same data.
+
+    Arguments:
+        weights: list(int) -- list of weights
+        profiles: list(int) -- list of profiles
+        lmbda: int -- lambda value
+        n_generated: int -- number of instances
+    Returns:
+        np.array(float) -- marks of the instances (instances x criteria)
+        np.array(int) -- class of each instance
     """
-    _class = 0
-    for profile in profiles:
-        sum_weights = 0
-        for j, mark in enumerate(marks):
-            if mark >= profile[j]:
-                sum_weights += weights[j]
-        if sum_weights < lmbda:
-            break
-        _class += 1
-    return _class
+    marks = np.zeros((n_generated, len(profiles[0])))
+    wrong_classes = {}  # {instance: class drawn instead of its MR-Sort class}
+    for k in range(n_generated):
+        index = np.random.choice(range(len(profiles)))
+        profile = profiles[index]
+        marks[k] = np.array(profile) + np.random.randn(len(profile)) * std
+        if error_rate > 0:
+            if np.random.rand() < error_rate:
+                wrong_classes[k] = np.random.randint(0, len(profiles)+1)
+    marks = np.vectorize(value_quantization, otypes=[float])(marks)
+    marks = np.clip(marks, 0, 20)
+    
+    classes = mr_sort_classes(marks, weights, profiles, lmbda)
+    for k, _class in wrong_classes.items():
+        classes[k] = _class
+    return marks, classes
 
 
 def get_instance(
     weights: list[float], profiles: list[list[float]], lmbda: float, std=2, error_rate = 0
 ) -> list:
     """
-    Generates an instance (marks + class).
+    Generates an instance (marks + class), see get_instances.
 
     Arguments:
         weights: list(int) -- list of weights
@@ -68,14 +143,5 @@ def get_instance(
     Returns:
         list(int) -- list of marks and class for the instance
     """
-    index = np.random.choice(range(len(profiles)))
-    profile = profiles[index] 
-    marks = np.array(profile) + np.random.randn(len(profile)) * std
-    marks =np.array(list( map(value_quantization, marks) ))
-    marks = np.clip(marks, 0, 20)
-    
-    _class = mr_sort(marks, weights, profiles, lmbda)
-    if error_rate > 0:
-        if np.random.rand() < error_rate:
-            _class = np.random.randint(0, len(profiles)+1)
-    return list(marks) + [_class]
+    marks, classes = get_instances(weights, profiles, lmbda, 1, std=std, error_rate=error_rate)
+    return list(marks[0]) + [int(classes[0])]
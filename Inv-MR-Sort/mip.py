@@ -14,7 +14,7 @@ from gurobipy import Model, GRB, quicksum
 from config import solution_saving_path, data_saving_path
 from utils import Capturing # to make Gurobi quiet
 from utils import value_quantization
-from instance_generation import mr_sort
+from instance_generation import MRSortModel
 
 class MIPSolver:
     def __init__(
@@ -32,6 +32,7 @@ class MIPSolver:
             self.data = data_file 
         self.model = None
         self.trained = False
+        self.solution = None  # MRSortModel extracted from the Gurobi model by solve
         self.epsilon = epsilon
         self.M = M
         self.p = None
@@ -188,6 +189,7 @@ class MIPSolver:
             # print("status : ", self.model.status)
         
         self.trained = True
+        self.solution = self._extract_solution()
         
         if save_solution:
             # Writing the solution in a file
@@ -196,18 +198,28 @@ class MIPSolver:
             self.model.write(self.sol_file)
 
     
+    def _extract_solution(self):
+        """
+        Reads the learnt parameters from the Gurobi model, once: the solver then predicts without querying it.
+        Returns None if Gurobi found no solution.
+        """
+        if self.model.SolCount == 0:
+            return None
+        lmbda = self.model.getVarByName("lmbda").x
+        weights = [self.model.getVarByName("w[" + str(i) + "]").x for i in range(self.n)]
+        profiles = [
+            [self.model.getVarByName("b[" + str(i) + "," + str(h+1) + "]").x for i in range(self.n)]
+            for h in range(self.p)
+        ]
+        return MRSortModel(profiles, weights, lmbda)
+    
     def get_solution(self, verbose=None):
         assert self.trained, "The model has not been trained yet"
+        assert self.solution is not None, "No solution was found"
         
-        profiles = [] #[[]]
-        weights = []
-        lmbda = self.model.getVarByName("lmbda").x
-        for i in range(self.n):
-            weights.append(self.model.getVarByName("w[" + str(i) + "]").x)
-        for h in range(self.p):
-            profiles.append([])
-            for i in range(self.n):
-                profiles[h].append(self.model.getVarByName("b[" + str(i) + ","+ str(h+1) +"]").x)
+        profiles = self.solution.profiles.tolist()
+        weights = self.solution.weights.tolist()
+        lmbda = self.solution.lmbda
         
         if verbose or (verbose == None and self.verbose):
             rounded_weights = [round(w, 3) for w in weights]
@@ -228,9 +240,5 @@ class MIPSolver:
     
     def predict(self, X: np.ndarray) -> list:
         assert self.trained, "The model has not been trained yet"
-        
-        predicted_classes = []
-        profiles, weights, lmbda = self.get_solution(verbose = False)
-        for row in X:
-            predicted_classes.append(mr_sort(row, weights, profiles, lmbda)) # remove classe
-        return predicted_classes
\ No newline at end of file
+        assert self.solution is not None, "No solution was found"
+        return self.solution.predict(X)
\ No newline at end of file
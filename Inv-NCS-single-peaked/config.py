@@ -6,8 +6,7 @@ import numpy as np
 data_saving_path = os.path.join(os.path.dirname(__file__), "data/test_data.csv")
 learning_data_path = os.path.join(os.path.dirname(__file__), "data/learning_data.csv")
 solution_saving_path = os.path.join(os.path.dirname(__file__), "output/solution.sol")
-solver_log_path = os.path.join(os.path.dirname(__file__), "output/solver_output.log")
-dimacs_saving_path = os.path.join(os.path.dirname(__file__), "output/workingfile")
+scratch_dir = None  # parent of the working directory of each solver, None for the system temporary directory
 os_name = platform.system().lower().replace("windows", "win") + "64"
 gophersat_dir = os.path.join(os.path.dirname(__file__), "gophersat", os_name)
 gophersat_path = glob.glob(gophersat_dir + "/gophersat*")[0]
@@ -66,6 +66,100 @@ def ncs_single_peaked(marks, criteria, coalitions, profiles):
     return h + 1
 
 
+def mask_to_coalition(mask):
+    """
+    Returns the coalition (tuple of criteria) encoded by a bitmask: criterion i belongs to it iff the bit i is set.
+    """
+    return tuple(i for i in range(mask.bit_length()) if mask >> i & 1)
+
+
+def upward_closure(table):
+    """
+    Makes each level of a coalition table (levels x 2^n) upward-closed, in place: the coalitions (bitmasks) marked at
+    a level are spread to their supersets one criterion at a time, in O(n 2^n).
+    """
+    masks = np.arange(table.shape[1])
+    for i in range(table.shape[1].bit_length() - 1):
+        with_i = masks[(masks >> i) & 1 == 1]
+        table[:, with_i] |= table[:, with_i ^ (1 << i)]
+    return table
+
+
+def sufficiency_table(coalitions, n, levels):
+    """
+    Returns the boolean table (levels x 2^n) of the sufficient coalitions: table[h-1, B] is True if the coalition B
+    (bitmask) is sufficient at level h, that is if it contains a coalition given as sufficient at level h.
+
+    Arguments:
+        coalitions: dict -- {coalition (tuple of criteria): [levels where it is sufficient]}, as learnt by the solvers
+    """
+    table = np.zeros((levels, 1 << n), dtype=bool)
+    for coalition, coalition_levels in coalitions.items():
+        table[np.array(coalition_levels, dtype=np.int64) - 1, sum(1 << i for i in coalition)] = True
+    return upward_closure(table)
+
+
+def minimal_coalitions(table):
+    """
+    Returns the minimal sufficient coalitions of each level, as sorted arrays of bitmasks: the antichain from which
+    the upward-closed level of the table is recovered (see antichain_table).
+    A coalition is minimal if it is sufficient and none of the coalitions without one of its criteria is.
+
+    Arguments:
+        table: np.ndarray -- sufficient coalitions (levels x 2^n), see sufficiency_table
+    """
+    table = upward_closure(table.copy())
+    minimal = table.copy()
+    masks = np.arange(table.shape[1])
+    for i in range(table.shape[1].bit_length() - 1):
+        with_i = masks[(masks >> i) & 1 == 1]
+        minimal[:, with_i] &= ~table[:, with_i ^ (1 << i)]
+    return [np.flatnonzero(level) for level in minimal]
+
+
+def antichain_table(minimal, n):
+    """
+    Returns the table (levels x 2^n) of the sufficient coalitions from the minimal ones of each level (bitmasks).
+    """
+    table = np.zeros((len(minimal), 1 << n), dtype=bool)
+    for h, masks in enumerate(minimal):
+        table[h, masks] = True
+    return upward_closure(table)
+
+
+def coalitions_levels(minimal):
+    """
+    Returns the minimal sufficient coalitions (bitmasks of each level) as {coalition (tuple of criteria): [levels]},
+    the format of sol["sufficient_coalitions"].
+    """
+    coalitions = {}
+    for h, masks in enumerate(minimal):
+        for mask in masks:
+            coalitions.setdefault(mask_to_coalition(int(mask)), []).append(h + 1)
+    return coalitions
+
+
+def ncs_single_peaked_classes(X, profiles, table):
+    """
+    Returns the classes of the instances (rows of X) with a single-peaked NCS model, vectorised: an instance reaches
+    the level h if the coalition of the criteria where its marks are within the bounds of the level h is sufficient
+    at level h, and its class is the number of levels it reaches from the first one.
+    Unlike ncs_single_peaked, a coalition only counts at the levels where the table makes it sufficient.
+
+    Arguments:
+        X: np.ndarray -- marks of the instances (instances x criteria)
+        profiles: np.ndarray -- lower and upper bounds of each level, alternately (2 levels x criteria)
+        table: np.ndarray -- sufficient coalitions, see sufficiency_table
+    """
+    lower_bounds, upper_bounds = profiles[0::2], profiles[1::2]
+    V = np.zeros((len(X), len(lower_bounds)), dtype=np.int64)  # validated coalition (instances x levels)
+    for i in range(X.shape[1]):
+        within = (X[:, i, None] >= lower_bounds[None, :, i]) & (X[:, i, None] <= upper_bounds[None, :, i])
+        V |= within.astype(np.int64) << i
+    reached = table[np.arange(len(lower_bounds)), V]
+    return np.cumprod(reached, axis=1).sum(axis=1)
+
+
 def generate_one(criteria, coalitions, profiles, std=2):
     """
     Generates an instance (marks + class).
@@ -0,0 +1,85 @@
+"""
+Encoding of the single-peaked criteria, shared by the solvers.
+The marks validating a criterion wrt a profile must form an interval of its sorted distinct marks. Instead of one
+clause per triple of marks (k < k" < k'), the interval is encoded with two ladders of auxiliary variables:
+    left[i,h,k]  positive if a mark <= k validates the criterion i wrt the profile b_h (the peak is reached)
+    right[i,h,k] positive if a mark >= k validates the criterion i wrt the profile b_h (the peak is not passed)
+so that the convexity takes O(m) clauses per criterion and level instead of O(m^3).
+The criteria with increasing preferences (see preprocessing.py) only need the chain of their marks, as in Inv-NCS.
+"""
+
+import numpy as np
+
+
+def ladder_variables(marks, p, counter, shapes):
+    """
+    Returns the left and right ladder variables ({(i, h, k): id}) of the single-peaked criteria, numbered by `counter`.
+
+    Arguments:
+        marks: list(np.ndarray) -- sorted distinct marks of each criterion
+        p: int -- number of classes
+        shapes: list(str) -- shape of each criterion, "increasing" or "peaked"
+    """
+    peaked = [i for i, shape in enumerate(shapes) if shape == "peaked"]
+    left = {(i, h, k): next(counter) for i in peaked for h in range(1, p) for k in marks[i]}
+    right = {(i, h, k): next(counter) for i in peaked for h in range(1, p) for k in marks[i]}
+    return left, right
+
+
+def clauses_convexity(x, left, right, marks, p, shapes):
+    """
+    Generates the clauses forcing the marks validating the criterion i wrt the profile b_h to form an interval:
+    a validated mark sets both ladders, the left ladder goes up the marks and the right one down,
+    and a mark where both ladders are set is validated.
+    For an increasing criterion, the interval is closed upwards: a mark validates it if the previous one does.
+    """
+    for i, values in enumerate(marks):
+        for h in range(1, p):
+            if shapes[i] == "increasing":
+                for previous, k in zip(values[:-1], values[1:]):
+                    yield [x[i, h, k], -x[i, h, previous]]
+                continue
+            for rank, k in enumerate(values):
+                yield [left[i, h, k], -x[i, h, k]]
+                yield [right[i, h, k], -x[i, h, k]]
+                yield [x[i, h, k], -left[i, h, k], -right[i, h, k]]
+                if rank > 0:
+                    previous = values[rank - 1]
+                    yield [left[i, h, k], -left[i, h, previous]]
+                    yield [right[i, h, previous], -right[i, h, k]]
+
+
+def decode_profiles(variables, marks, p, shapes, bounds=(0, 20)):
+    """
+    Returns the intervals of the profiles from the values of the x variables.
+    For each level h, the lower and upper bounds of the accepted marks are the profiles 2(h-1) and 2(h-1)+1, as in
+    ncs_single_peaked. Each bound lies between the last rejected and the first validated mark of its side
+    (`bounds` when there is no such mark). When no mark validates the criterion, the interval is empty: the lower
+    bound is the maximum of `bounds` and the upper bound its minimum.
+    The upper bound of an increasing criterion is the maximum of `bounds`.
+
+    Arguments:
+        variables: dict -- {variable: value}, holding the x variables {(i, h, k): value}
+        marks: list(np.ndarray) -- sorted distinct marks of each criterion
+        shapes: list(str) -- shape of each criterion, "increasing" or "peaked"
+    Returns:
+        list(list([float, float])) -- intervals of the profiles: profile x criterion -> [min, max]
+    """
+    profiles_intervals = [[list(bounds) for _ in marks] for _ in range(2 * (p - 1))]
+    if not variables:  # no model
+        return profiles_intervals
+    for i, values in enumerate(marks):
+        for h in range(1, p):
+            validated = np.flatnonzero([variables[i, h, k] for k in values])
+            if len(validated) == 0:
+                profiles_intervals[2 * (h - 1)][i] = [bounds[1], bounds[1]]
+                profiles_intervals[2 * (h - 1) + 1][i] = [bounds[0], bounds[0]]
+                continue
+            first, last = validated[0], validated[-1]
+            lower, upper = profiles_intervals[2 * (h - 1)][i], profiles_intervals[2 * (h - 1) + 1][i]
+            lower[:] = [values[first - 1] if first > 0 else bounds[0], values[first]]
+            if shapes[i] == "increasing":
+                upper[:] = [bounds[1], bounds[1]]
+            else:
+                upper[:] = [values[last], values[last + 1] if last + 1 < len(values) else bounds[1]]
+    return profiles_intervals
@@ -1,7 +1,7 @@
 from maxsat import MaxSATSolver
 from data_generator import generate_data
 from sklearn.metrics import confusion_matrix, accuracy_score, f1_score, precision_score, recall_score
-from config import data_saving_path, solution_saving_path, dimacs_saving_path, gophersat_path
+from config import data_saving_path, solution_saving_path, gophersat_path
 import config
 from time import time
 from matplotlib import pyplot as plt
@@ -34,7 +34,7 @@ def eval_parameters(params: dict, verbose_results=True, verbose_progress=False)
     data_test, data_train, _ = generate_data(config.params, balanced=True, verbose=False, save=False)
     test_classes = list(data_test["class"])
 
-    solver = MaxSATSolver(data_train, None, dimacs_saving_path, gophersat_path)
+    solver = MaxSATSolver(data_train, None, gophersat_path=gophersat_path)
     tik = time()
     solver.solve(save_solution=False, verbose=False)
     tok = time()
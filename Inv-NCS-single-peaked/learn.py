@@ -7,7 +7,7 @@ import os
 import pandas as pd
 from sat import SATSolver
 from maxsat import MaxSATSolver
-from config import learning_data_path, solution_saving_path, dimacs_saving_path, gophersat_path
+from config import learning_data_path, solution_saving_path, gophersat_path
 from pyfiglet import Figlet
 
 
@@ -15,7 +15,7 @@ def inverse_ncs(
     solver_name="MaxSAT",
     data_file=learning_data_path,
     save_path=solution_saving_path,
-    dimacs_saving_path=dimacs_saving_path,
+    dimacs_saving_path=None,
     gophersat_path=gophersat_path,
     print_solution=True,
     save_solution=True,
@@ -8,11 +8,14 @@ https://www.researchgate.net/publication/221367488_Learning_the_Parameters_of_a_
 import numpy as np
 import pandas as pd
 import os
-from config import solution_saving_path, learning_data_path, dimacs_saving_path, gophersat_path, solver_log_path
+from config import solution_saving_path, learning_data_path, gophersat_path, scratch_dir
 import subprocess
-from itertools import combinations
+from itertools import combinations, count
 import time
-from data_generator import ncs_single_peaked
+from dimacs import DimacsWriter, scratch_directory
+from encoding import ladder_variables, clauses_convexity, decode_profiles
+from preprocessing import SHAPES, criterion_shapes, without_column
+from data_generator import minimal_coalitions, antichain_table, coalitions_levels, ncs_single_peaked_classes
 
 
 class MaxSATSolver:
@@ -20,11 +23,16 @@ class MaxSATSolver:
         self,
         data_file=learning_data_path,
         sol_file=solution_saving_path,
-        dimacs_file=dimacs_saving_path,
+        dimacs_file=None,
         gophersat_path=gophersat_path,
+        shapes="peaked",  # shape of each criterion, "peaked" for all, "auto" to detect them (see preprocessing.py)
     ):
         self.sol_file = sol_file
-        self.solver_log_file = solver_log_path
+        # the formula (unless a path is given) and the log are written in a working directory of the solver
+        self.work_dir = scratch_directory(self, scratch_dir)
+        self.solver_log_file = os.path.join(self.work_dir, "solver_output.log")
+        if dimacs_file is None:
+            dimacs_file = os.path.join(self.work_dir, "workingfile")
         self.dimacs_file = dimacs_file + ".wcnf"
         self.gophersat_path = gophersat_path
         if type(data_file) == str:
@@ -32,12 +40,15 @@ class MaxSATSolver:
         else:  # if data_file is a dataframe
             self.data = data_file
         self.mistakes = self.data["is_mistake"]
-        self.data.drop(columns=["is_mistake"], inplace=True)
+        self.data = without_column(self.data, "is_mistake")
 
         self.i2v = None
+        self.marks = None  # sorted distinct marks of each criterion
+        self.shapes = shapes
         self.n = None  # number of criteria
         self.build_model()
         self.learnt_params = {}
+        self.compiled_model = None  # profiles and table of the sufficient coalitions, see compile
 
     def build_model(self):
         # Resolution of NCS
@@ -57,7 +68,7 @@ class MaxSATSolver:
         # X[i] = list of marks in criterion i;
         X = np.array([self.data.iloc[:, i] for i in criteria])
 
-        counter = iter(range(1, X.size * (p - 1) + len(criteria_combinations) * (p - 1) + len(self.data.index) + 1))
+        counter = count(1)
         # x[i,h,k] positive  means the mark k validates the criterion i wrt the profile b_h
         self.x = x = {}
         for i in criteria:
@@ -72,118 +83,96 @@ class MaxSATSolver:
         # z[u] positive if u is correctly classified
         self.z = z = {u: next(counter) for u in self.data.index}
 
-        variables = list(x.keys()) + list(y.keys()) + list(z.keys())
-        v2i = {**x, **y, **z}
+        # left[i,h,k], right[i,h,k] ladders of the convexity of the validated marks of the single-peaked criteria
+        self.marks = [np.unique(X[i]) for i in criteria]
+        if self.shapes == "auto":
+            self.shapes = criterion_shapes(X.T, self.data["class"].to_numpy())
+        elif self.shapes == "peaked":
+            self.shapes = ["peaked"] * self.n
+        assert len(self.shapes) == self.n and set(self.shapes) <= set(SHAPES), f"Shapes must be among {SHAPES}"
+        left, right = ladder_variables(self.marks, p, counter, self.shapes)
+
+        ladders = {**{("left",) + k: v for k, v in left.items()}, **{("right",) + k: v for k, v in right.items()}}
+        v2i = {**x, **y, **z, **ladders}
         self.i2v = {v: k for k, v in v2i.items()}
 
         C = lambda h: self.data.index[self.data["class"] == h]  # indexes of instances belonging to class h
 
         # if two students validate a criterion i with evaluation k and k'>k, then the mark k" where k <= k" <= k' must also validate i
-        clauses_c1 = [
-            [x[i, h, kpp], -x[i, h, k], -x[i, h, kp]]
-            for h in range(1, p)
-            for i in criteria
-            for k in X[i]
-            for kp in X[i]
-            for kpp in X[i]
-            if k < kpp < kp
-        ]
+        # encoded with ladders of auxiliary variables over the sorted distinct marks, see encoding.py
+        clauses_c1 = clauses_convexity(x, left, right, self.marks, p, self.shapes)
 
         # if student validates a criterion i wrt the profile b_h', then he must validate the criterion i wrt the profile b_h (h < h')
-        clauses_c2 = [
+        clauses_c2 = (
             [x[i, h, k], -x[i, hp, k]]
             for i in criteria
             for k in X[i]
             for h in range(1, p)
             for hp in range(1, p)
             if h < hp
-        ]
+        )
 
         # if B is sufficient then each B' containing B is sufficient
-        clauses_c3 = [
+        clauses_c3 = (
             [y[Bp, h], -y[B, h]]
             for h in range(1, p)
             for B in criteria_combinations
             for Bp in criteria_combinations
             if set(B).issubset(set(Bp)) and set(B) != set(Bp)
-        ]
+        )
 
         # if B is sufficient at level hp then B is sufficient at level h < hp
-        clauses_c4 = [
+        clauses_c4 = (
             [y[B, h], -y[B, hp]] for B in criteria_combinations for h in range(1, p) for hp in range(1, p) if h < hp
-        ]
+        )
 
         # if a student is in class h-1 and validates all criteria (i,h) in B, then B is not sufficient
-        clauses_c5_ = []
-        for h in range(1, p):
-            for B in criteria_combinations:
-                for u in C(h - 1):
-                    clauses_c5_.append([-y[B, h], -z[u]] + [-x[i, h, X[i, u]] for i in B])
+        clauses_c5_ = (
+            [-y[B, h], -z[u]] + [-x[i, h, X[i, u]] for i in B]
+            for h in range(1, p)
+            for B in criteria_combinations
+            for u in C(h - 1)
+        )
 
         # if a student is in class h and doesnt validate any criteria (i,h) in B, then complementary of B is sufficient
-        clauses_c6_ = []
-        for h in range(1, p):
-            for B in criteria_combinations:
-                B_comp = tuple([i for i in criteria if i not in B])  # complementary
-                for u in C(h):
-                    clauses_c6_.append([y[B_comp, h], -z[u]] + [x[i, h, X[i, u]] for i in B])
+        clauses_c6_ = (
+            [y[tuple([i for i in criteria if i not in B]), h], -z[u]] + [x[i, h, X[i, u]] for i in B]
+            for h in range(1, p)
+            for B in criteria_combinations
+            for u in C(h)
+        )
 
         # maximize number of correctly classified instances(=alternative)
-        clauses_goal = [[z[u]] for u in self.data.index]
+        clauses_goal = ([z[u]] for u in self.data.index)
 
-        self.myClauses = clauses_c1 + clauses_c2 + clauses_c3 + clauses_c4 + clauses_c5_ + clauses_c6_ + clauses_goal
         self.w_max = self.data.size + 1
         w1 = 1
-        self.weights = [self.w_max] * (len(self.myClauses) - len(clauses_goal)) + [w1] * len(clauses_goal)
 
-        self.myDimacs = self._clauses_to_dimacs(self.myClauses, self.weights, len(variables))
-        self._write_dimacs_file(self.myDimacs, self.dimacs_file)
+        # the clauses are streamed to the file as they are generated, they are not kept in memory
+        with DimacsWriter(self.dimacs_file, len(v2i), weighted=True) as writer:  # Weighted Max-SAT
+            for clauses in [clauses_c1, clauses_c2, clauses_c3, clauses_c4, clauses_c5_, clauses_c6_]:
+                writer.write_clauses(clauses, weight=self.w_max)
+            writer.write_clauses(clauses_goal, weight=w1)
 
     def solve(self, save_solution=True, verbose=True):
         # Start the solver
         sol = self._exec_gophersat(self.dimacs_file, verbose=verbose)
 
-        # find the anchor
-        anchor_marks = [None for _ in range(self.n)]
-        for var, is_satisfied in list(sol["variables"].items())[: len(self.x)]:
-            if is_satisfied:
-                criterion, h, mark = var
-                anchor_marks[criterion] = mark
-        # find profiles intervals
-        profiles_intervals = [[[0, 20] for _ in range(self.n)] for _ in range(self.p )]
-        for var, is_satisfied in list(sol["variables"].items())[: len(self.x)]:
-            criterion, h, mark = var
-            if is_satisfied:  # marks validates criterion
-                profiles_intervals[h - 1][criterion][1] = min(profiles_intervals[h - 1][criterion][1], mark)
-                profiles_intervals[h][criterion][0] = max(profiles_intervals[h][criterion][0], mark)
-            elif anchor_marks[criterion] != None:
-                if mark > anchor_marks[criterion]:
-                    profiles_intervals[h][criterion][1] = min(profiles_intervals[h][criterion][1], mark)
-                else:
-                    profiles_intervals[h - 1][criterion][0] = max(profiles_intervals[h - 1][criterion][0], mark)
-        
-        for var, is_satisfied in list(sol["variables"].items())[: len(self.x)]:
-            criterion, h, mark = var
-            if is_satisfied:  # marks validates criterion
-                profiles_intervals[h - 1][criterion][1] = min(profiles_intervals[h - 1][criterion][1], mark)
-                profiles_intervals[h][criterion][0] = max(profiles_intervals[h][criterion][0], mark)
-        
-        sol["profiles_intervals"] = profiles_intervals
-
-        sol["sufficient_coalitions"] = {}  # {B: [h where B is sufficient at level h]}
-        for var, is_sufficient in list(sol["variables"].items())[len(self.x) : len(self.x) + len(self.y)]:
+        # the validated marks of each criterion form an interval, bounded by the profiles
+        sol["profiles_intervals"] = decode_profiles(sol["variables"], self.marks, self.p, self.shapes)
+
+        # only the minimal sufficient coalitions of each level are kept, their supersets are sufficient as well
+        sufficient = np.zeros((self.p - 1, 1 << self.n), dtype=bool)
+        for var in self.y if sol["variables"] else []:
             B, h = var
-            if is_sufficient:
-                if B in sol["sufficient_coalitions"]:
-                    sol["sufficient_coalitions"][B].append(h)
-                else:
-                    sol["sufficient_coalitions"][B] = [h]
+            sufficient[h - 1, sum(1 << i for i in B)] = sol["variables"][var]
+        minimal = minimal_coalitions(sufficient)  # bitmasks of each level
+        sol["sufficient_coalitions"] = coalitions_levels(minimal)  # {B: [h where B is minimal sufficient at level h]}
 
         sol["correctly_classified"] = []  # indexes of correctly classified instances
         sol["uncorrectly_classified"] = []  # indexes of incorrectly classified instances
-        for var, is_correctly_classified in list(sol["variables"].items())[len(self.x) + len(self.y) :]:
-            u = var
-            if is_correctly_classified:
+        for u in self.z if sol["variables"] else []:
+            if sol["variables"][u]:
                 sol["correctly_classified"].append(u)
             else:
                 sol["uncorrectly_classified"].append(u)
@@ -215,33 +204,36 @@ class MaxSATSolver:
 
         self.learnt_params = {
             "criteria": list(range(self.n)),
-            "coalitions": sol["sufficient_coalitions"],
+            "coalitions": minimal,
             "profiles_intervals": [
                 [(h_min + h_max) / 2 for h_min, h_max in profile] for profile in sol["profiles_intervals"]
             ],
         }
+        self.compile()
         return sol
 
+    def compile(self):
+        """
+        Compiles the learnt model for predict: the profiles as an array, and the table (levels x 2^n) telling for each
+        level whether a coalition (bitmask) contains one of its minimal sufficient coalitions (see antichain_table).
+        An instance is then classified by comparing its marks to the profiles and one lookup per level.
+
+        Returns:
+            np.ndarray, np.ndarray -- profiles and table of the sufficient coalitions
+        """
+        profiles = np.array(self.learnt_params["profiles_intervals"])
+        table = antichain_table(self.learnt_params["coalitions"], self.n)
+        self.compiled_model = (profiles, table)
+        return self.compiled_model
+
     def predict(self, X: np.ndarray) -> list:
-        predicted_classes = X.apply(self._predict_instance, axis=1, args=(self.learnt_params,)).to_list()
-        return predicted_classes
-
-    def _predict_instance(self, marks, params):
-        criteria, coalitions, profiles = params["criteria"], params["coalitions"], params["profiles_intervals"]
-        return ncs_single_peaked(marks, criteria, coalitions, profiles)
-
-    def _clauses_to_dimacs(self, clauses, weights, numvar):
-        # Convert a list of clauses to a DIMACS format
-        # more info: http://www.maxsat.udl.cat/08/index.php?disp=requirements
-        dimacs = "c This is it\np wcnf " + str(numvar) + " " + str(len(clauses)) + "\n"  # Weighted Max-SAT
-        # dimacs = "c This is it\np wcnf " + str(numvar) + " " + str(len(clauses)) + " " + str(self.w_max) + "\n" # Weigthed Partial Max-SAT
-        for clause, w in zip(clauses, weights):
-            dimacs += str(w) + " " + " ".join(map(str, clause)) + " 0\n"
-        return dimacs
-
-    def _write_dimacs_file(self, dimacs, filename):
-        with open(filename, "w", newline="") as cnf:
-            cnf.write(dimacs)
+        """
+        Classifies the instances (rows of marks) with the compiled model (see ncs_single_peaked_classes).
+        """
+        if self.compiled_model is None:
+            self.compile()
+        profiles, table = self.compiled_model
+        return ncs_single_peaked_classes(np.asarray(X, dtype=float), profiles, table).tolist()
 
     def _exec_gophersat(self, filename, encoding="utf8", verbose=True):
         cmd = self.gophersat_path
@@ -0,0 +1,55 @@
+"""
+Preprocessing of the learning set before its encoding by the solvers.
+Only the criteria whose marks show a single-peaked behaviour get the interval encoding, the others are encoded as
+monotone criteria (as in Inv-NCS), which needs neither the ladder variables nor an upper bound of the profiles.
+"""
+
+import numpy as np
+import pandas as pd
+
+SHAPES = ["increasing", "peaked"]
+
+
+def without_column(data, column):
+    """
+    Returns the dataframe without a column. Unlike DataFrame.drop, which copies the whole frame, the other columns
+    are shared with `data`: the solvers never write to their learning set, so the caller's dataframe is left untouched.
+    """
+    return pd.DataFrame({c: data[c] for c in data.columns if c != column}, copy=False)
+
+
+def upper_tail_excess(x, accepted):
+    """
+    Returns the largest excess of P(mark > t | rejected) over P(mark > t | accepted), over the thresholds t above
+    the median mark of the accepted examples: a one-sided Kolmogorov-Smirnov statistic on the upper tails.
+    Raising the mark of an increasing criterion can only help an example, so the rejected examples should not
+    have high marks more often than the accepted ones: a large excess means that high marks are rejected.
+
+    Arguments:
+        x: np.ndarray -- marks of the examples on a criterion
+        accepted: np.ndarray -- boolean mask of the examples assigned to the level or above
+    """
+    if accepted.all() or not accepted.any():
+        return 0.0
+    thresholds = np.unique(x[accepted & (x >= np.median(x[accepted]))])
+    above_rejected = len(x[~accepted]) - np.searchsorted(np.sort(x[~accepted]), thresholds, side="right")
+    above_accepted = len(x[accepted]) - np.searchsorted(np.sort(x[accepted]), thresholds, side="right")
+    return float(np.max(above_rejected / len(x[~accepted]) - above_accepted / len(x[accepted])))
+
+
+def criterion_shapes(X, classes, threshold=0.1):
+    """
+    Tests each criterion for a monotone or a single-peaked behaviour, see upper_tail_excess.
+    A criterion is single-peaked if its excess is above `threshold` at a level of the classes.
+
+    Arguments:
+        X: np.ndarray -- marks of the examples (examples x criteria)
+        classes: np.ndarray -- classes of the examples
+    Returns:
+        list(str) -- shape of each criterion, "increasing" or "peaked"
+    """
+    shapes = []
+    for i in range(X.shape[1]):
+        excess = max((upper_tail_excess(X[:, i], classes >= h) for h in range(1, max(classes) + 1)), default=0.0)
+        shapes.append("peaked" if excess > threshold else "increasing")
+    return shapes
@@ -0,0 +1,31 @@
+"""
+Treating every criterion as single-peaked must learn noise-free learning data at least as well as detecting the shapes.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+import pytest
+import config
+from data_generator import generate_data
+from maxsat import MaxSATSolver
+from sat import SATSolver
+
+
+@pytest.mark.parametrize("seed", [0, 6])
+def test_peaked_shapes_learn_noise_free_learning_data(seed):
+    # with seed 6, the detection takes the single-peaked criterion 0 for an increasing one
+    np.random.seed(seed)
+    params = dict(config.params, n_learning_set=60, mu=0.0)
+    _, learning_data, _ = generate_data(params, save=False)
+
+    assert SATSolver(learning_data, None).solve(save_solution=False)["satisfiable"]
+    errors = {}
+    for shapes in ["peaked", "auto"]:
+        sol = MaxSATSolver(learning_data, None, shapes=shapes).solve(save_solution=False, verbose=False)
+        errors[shapes] = len(sol["uncorrectly_classified"])
+    assert errors["peaked"] == 0
+    assert errors["peaked"] <= errors["auto"]
@@ -0,0 +1,99 @@
+"""
+Streaming writer for DIMACS (cnf) and weighted DIMACS (wcnf) files.
+Clauses are written as soon as they are produced, so a formula never has to be held in memory.
+more info: http://www.maxsat.udl.cat/08/index.php?disp=requirements
+"""
+
+import shutil
+import tempfile
+import weakref
+import numpy as np
+
+HEADER_WIDTH = 64  # characters reserved for the header line, which is fixed up once the counts are known
+BUFFER_SIZE = 1 << 20
+BLOCK_ROWS = 1 << 16  # clauses formatted at once by write_block
+
+
+class DimacsWriter:
+    """
+    Writes clauses to a DIMACS file. The `p cnf`/`p wcnf` header is reserved at the top of the file
+    and filled in when the writer is closed, once the number of clauses is known.
+
+    Arguments:
+        filename: str -- path of the file to write
+        numvar: int -- number of variables of the formula
+        weighted: bool -- if True, writes a wcnf file where each clause is preceded by its weight
+        top: int -- weight of the hard clauses (weighted partial MaxSAT), None for weighted MaxSAT
+        append: bool -- if True, adds the clauses at the end of a file written by a DimacsWriter
+    """
+
+    def __init__(self, filename, numvar, weighted=False, top=None, append=False):
+        self.filename = filename
+        self.numvar = numvar
+        self.weighted = weighted
+        self.top = top
+        if append:
+            self._file = open(filename, "r+", newline="", buffering=BUFFER_SIZE)
+            self.n_clauses = int(self._file.readline().split()[3])  # p cnf|wcnf numvar n_clauses [top]
+            self._file.seek(0, 2)
+        else:
+            self.n_clauses = 0
+            self._file = open(filename, "w", newline="", buffering=BUFFER_SIZE)
+            self._file.write("c" + " " * (HEADER_WIDTH - 1) + "\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write_clauses(self, clauses, weight=None):
+        """
+        Writes an iterable of clauses (lists of literals), all with the same weight when the file is weighted.
+        """
+        assert self.weighted == (weight is not None), "A weight must be given if and only if the file is weighted"
+        prefix = f"{weight} " if self.weighted else ""
+        write = self._file.write
+        for clause in clauses:
+            write(prefix + " ".join(map(str, clause)) + " 0\n")
+            self.n_clauses += 1
+
+    def write_block(self, block, weights=None):
+        """
+        Writes a 2d array of clauses (one clause per row), with one weight per clause when the file is weighted.
+        """
+        assert self.weighted == (weights is not None), "Weights must be given if and only if the file is weighted"
+        if self.weighted:
+            block = np.column_stack([weights, block])
+        line = "%d " * block.shape[1] + "0\n"
+        for start in range(0, len(block), BLOCK_ROWS):
+            rows = block[start : start + BLOCK_ROWS]
+            self._file.write((line * len(rows)) % tuple(rows.ravel().tolist()))
+        self.n_clauses += len(block)
+
+    def close(self):
+        if self.weighted:
+            header = f"p wcnf {self.numvar} {self.n_clauses}"
+            if self.top is not None:
+                header += f" {self.top}"
+        else:
+            header = f"p cnf {self.numvar} {self.n_clauses}"
+        assert len(header) <= HEADER_WIDTH, "DIMACS header too long"
+        self._file.seek(0)
+        self._file.write(header.ljust(HEADER_WIDTH))
+        self._file.close()
+
+
+def scratch_directory(owner, parent=None):
+    """
+    Creates a working directory of its own for `owner` (a solver), removed when the owner is garbage collected,
+    so that several solves can run at the same time without overwriting each other's files.
+
+    Arguments:
+        parent: str -- directory where the working directory is created, None for the system temporary directory
+    Returns:
+        str -- path of the working directory
+    """
+    path = tempfile.mkdtemp(prefix="inv_ncs_", dir=parent)
+    weakref.finalize(owner, shutil.rmtree, path, ignore_errors=True)
+    return path
@@ -0,0 +1,290 @@
+"""
+Compact encoding of the Inv-NCS formulations, shared by the solvers.
+The variables are numbered arithmetically (no dictionaries of tuples), and the clauses are generated by
+blocks of NumPy arrays, written to the DIMACS file as they come. Only the MaxSAT solver keeps them, in a ClauseStore
+made of flat int32 arrays, for partial_fit.
+see paper https://www.researchgate.net/publication/354003148_Learning_Non-Compensatory_Sorting_models_using_efficient_SATMaxSAT_formulations
+paragraph 4.1. A SAT formulation for Inv-NCS based on coalitions
+"""
+
+import numpy as np
+from data_generator import mask_to_coalition
+
+
+class VariableLayout:
+    """
+    Numbering of the variables, computed from their indices:
+        x[i,h,k] -> x_ids[i][h - 1, rank of the mark k in marks[i]], consecutive ids criterion by criterion
+        y[B,h]   -> y_offset + B * (p - 1) + (h - 1), where B is the bitmask of the coalition
+        z[u]     -> z_ids[u], where u is the position of the example in the learning set
+    The variables added by `extend` are numbered after the existing ones.
+
+    Arguments:
+        X: np.ndarray -- marks of the examples (examples x criteria)
+        p: int -- number of classes
+        coalitions: bool -- if True, reserves the y variables (one per coalition and level)
+        n_z: int -- number of z variables to reserve
+    """
+
+    def __init__(self, X, p, coalitions=True, n_z=0):
+        self.n = n = X.shape[1]
+        self.levels = levels = p - 1
+        self.marks = [np.unique(X[:, i]) for i in range(n)]  # sorted distinct marks of each criterion
+        self.ranks = np.column_stack([np.searchsorted(self.marks[i], X[:, i]) for i in range(n)])
+
+        self.x_ids = []  # (levels x marks) ids of the x variables of each criterion
+        self.n_x = 0
+        for marks in self.marks:
+            self.x_ids.append(1 + self.n_x + np.arange(levels * len(marks)).reshape(levels, len(marks)))
+            self.n_x += levels * len(marks)
+        self.y_offset = 1 + self.n_x
+        self.n_y = 2**n * levels if coalitions else 0
+        self.z_ids = self.y_offset + self.n_y + np.arange(n_z)
+        self.numvar = self.n_x + self.n_y + n_z
+        self._inverse = None  # (kind, index, level, rank) of each variable, see decode
+
+    @property
+    def n_z(self):
+        return len(self.z_ids)
+
+    def x(self, i, h, rank):
+        return self.x_ids[i][h - 1, rank]
+
+    def y(self, B, h):
+        return self.y_offset + B * self.levels + (h - 1)
+
+    def z(self, u):
+        return self.z_ids[u]
+
+    def extend(self, X, n_z=0):
+        """
+        Adds the x variables of the marks of X that are not known yet, and n_z new z variables.
+        X holds the marks of all the examples (examples x criteria), the ranks are updated accordingly.
+        Returns, for each criterion, the boolean mask of the new marks among the updated marks.
+        """
+        new_marks = []
+        for i in range(self.n):
+            marks = np.union1d(self.marks[i], X[:, i])
+            is_new = ~np.isin(marks, self.marks[i])
+            ids = np.empty((self.levels, len(marks)), dtype=np.int64)
+            ids[:, ~is_new] = self.x_ids[i]
+            ids[:, is_new] = 1 + self.numvar + np.arange(self.levels * is_new.sum()).reshape(self.levels, -1)
+            self.numvar += ids.size - self.x_ids[i].size
+            self.n_x += ids.size - self.x_ids[i].size
+            self.marks[i], self.x_ids[i] = marks, ids
+            new_marks.append(is_new)
+        self.ranks = np.column_stack([np.searchsorted(self.marks[i], X[:, i]) for i in range(self.n)])
+        self.z_ids = np.concatenate([self.z_ids, 1 + self.numvar + np.arange(n_z)])
+        self.numvar += n_z
+        self._inverse = None
+        return new_marks
+
+    def decode(self, var):
+        """
+        Returns the key of the variable `var`: (i, h, mark) for x, (B, h) for y, and the position u for z.
+        """
+        if self._inverse is None:
+            kind, index, level, rank = (np.zeros(self.numvar + 1, dtype=np.int64) for _ in range(4))
+            for i, ids in enumerate(self.x_ids):
+                index[ids] = i
+                level[ids] = np.arange(1, self.levels + 1)[:, None]
+                rank[ids] = np.arange(ids.shape[1])
+            kind[self.y_offset : self.y_offset + self.n_y] = 1
+            kind[self.z_ids] = 2
+            index[self.z_ids] = np.arange(self.n_z)
+            self._inverse = kind, index, level, rank
+        kind, index, level, rank = self._inverse
+        if kind[var] == 0:
+            return (int(index[var]), int(level[var]), self.marks[index[var]][rank[var]])
+        if kind[var] == 1:
+            B, h = divmod(var - self.y_offset, self.levels)
+            return (int(B), int(h) + 1)
+        return int(index[var])
+
+
+class ClauseStore:
+    """
+    Clauses in CSR layout: the literals of all the clauses in one flat int32 array, with the offsets of the clauses
+    in it (clause j is literals[offsets[j]:offsets[j + 1]]) and one weight per clause.
+    Clauses are added by blocks of clauses of the same length, given as 2d arrays.
+    """
+
+    def __init__(self):
+        self._literals = [np.zeros(0, dtype=np.int32)]
+        self._lengths = [np.zeros(0, dtype=np.int32)]
+        self._weights = [np.zeros(0, dtype=np.int64)]
+        self._packed = True
+        self.n_clauses = 0
+
+    def __len__(self):
+        return self.n_clauses
+
+    def add(self, block, weight=0):
+        """
+        Adds a block of clauses (2d array, one clause per row), with a single weight or one weight per clause.
+        """
+        block = np.asarray(block, dtype=np.int32)
+        n_clauses, width = block.shape
+        self._literals.append(block.ravel())
+        self._lengths.append(np.full(n_clauses, width, dtype=np.int32))
+        self._weights.append(np.broadcast_to(np.asarray(weight, dtype=np.int64), (n_clauses,)).copy())
+        self._packed = False
+        self.n_clauses += n_clauses
+
+    def _pack(self):
+        if not self._packed:
+            self._literals = [np.concatenate(self._literals)]
+            self._lengths = [np.concatenate(self._lengths)]
+            self._weights = [np.concatenate(self._weights)]
+            self._packed = True
+
+    @property
+    def literals(self):
+        self._pack()
+        return self._literals[0]
+
+    @property
+    def offsets(self):
+        self._pack()
+        return np.concatenate([[0], np.cumsum(self._lengths[0], dtype=np.int64)])
+
+    @property
+    def weights(self):
+        self._pack()
+        return self._weights[0]
+
+    @property
+    def nbytes(self):
+        self._pack()
+        return self._literals[0].nbytes + self._lengths[0].nbytes + self._weights[0].nbytes
+
+    def write(self, writer, start=0):
+        """
+        Writes the clauses from the `start`-th one with a DimacsWriter, by runs of clauses of the same length.
+        """
+        self._pack()
+        lengths = self._lengths[0][start:]
+        offsets = self.offsets[start:]
+        weights = self.weights[start:]
+        # boundaries of the runs of clauses of the same length
+        bounds = np.concatenate([[0], np.flatnonzero(np.diff(lengths)) + 1, [len(lengths)]])
+        for a, b in zip(bounds[:-1], bounds[1:]):
+            block = self.literals[offsets[a] : offsets[b]].reshape(b - a, lengths[a])
+            writer.write_block(block, weights[a:b] if writer.weighted else None)
+
+
+def clauses_c1(layout, encoding="chain", new_marks=None):
+    """
+    if student validates a criterion i with evaluation k, then another student with criterion k'>k validates this
+    criterion surely.
+    With the chain encoding, only consecutive distinct marks are linked, the other implications follow by transitivity.
+    With `new_marks` (boolean mask of the marks of each criterion, see VariableLayout.extend), only the clauses
+    involving a new mark are generated.
+    """
+    for h in range(1, layout.levels + 1):
+        for i in range(layout.n):
+            x = layout.x(i, h, np.arange(len(layout.marks[i])))
+            if encoding == "chain":
+                k, kp = np.arange(len(x) - 1), np.arange(1, len(x))
+            else:  # pairwise, kept to verify the chain encoding
+                k, kp = np.triu_indices(len(x), 1)
+            if new_marks is not None:
+                involved = new_marks[i][k] | new_marks[i][kp]
+                k, kp = k[involved], kp[involved]
+            yield np.column_stack([x[kp], -x[k]])
+
+
+def clauses_c2(layout, new_marks=None):
+    """
+    if student validates a criterion i wrt the profile b_h', then he must validate the criterion i wrt the profile b_h
+    (h < h')
+    With `new_marks`, only the clauses of the new marks are generated.
+    """
+    for i in range(layout.n):
+        ranks = np.arange(len(layout.marks[i]))
+        if new_marks is not None:
+            ranks = ranks[new_marks[i]]
+        for h in range(1, layout.levels + 1):
+            for hp in range(h + 1, layout.levels + 1):
+                yield np.column_stack([layout.x(i, h, ranks), -layout.x(i, hp, ranks)])
+
+
+def clauses_c3(layout):
+    """
+    if B is sufficient then each B' containing B is sufficient.
+    Only B' = B + {i} is linked (cover relation), the other inclusions follow by transitivity.
+    """
+    coalitions = np.arange(2**layout.n)
+    for h in range(1, layout.levels + 1):
+        for i in range(layout.n):
+            B = coalitions[(coalitions >> i) & 1 == 0]
+            yield np.column_stack([layout.y(B | 1 << i, h), -layout.y(B, h)])
+
+
+def clauses_c4(layout):
+    """
+    if B is sufficient at level hp then B is sufficient at level h < hp
+    """
+    coalitions = np.arange(2**layout.n)
+    for h in range(1, layout.levels + 1):
+        for hp in range(h + 1, layout.levels + 1):
+            yield np.column_stack([layout.y(coalitions, h), -layout.y(coalitions, hp)])
+
+
+def violated_c3_c4(layout, model):
+    """
+    Returns the clauses of C3 and C4 violated by a model (model[v] is the value of the variable v), to add them
+    lazily: a coalition sufficient at level h whose superset B + {i} is not, or a coalition sufficient at level h + 1
+    but not at level h. Only these cover relations are checked, the other implications follow by transitivity.
+    """
+    sufficient = model[layout.y_offset : layout.y_offset + layout.n_y].reshape(-1, layout.levels)  # (2^n x levels)
+    coalitions = np.arange(2**layout.n)
+    blocks = [np.zeros((0, 2), dtype=np.int64)]
+    for i in range(layout.n):
+        B = coalitions[(coalitions >> i) & 1 == 0]
+        violated, h = np.nonzero(sufficient[B] & ~sufficient[B | 1 << i])
+        blocks.append(np.column_stack([layout.y(B[violated] | 1 << i, h + 1), -layout.y(B[violated], h + 1)]))
+    B, h = np.nonzero(sufficient[:, 1:] & ~sufficient[:, :-1])
+    blocks.append(np.column_stack([layout.y(B, h + 1), -layout.y(B, h + 2)]))
+    return np.concatenate(blocks)
+
+
+def clauses_c5(layout, classes, examples=None, relaxed=False):
+    """
+    if a student is in class h-1 and validates all criteria (i,h) in B, then B is not sufficient.
+    With `relaxed`, the clause of the student u only holds if z[u] is true (MaxSAT relaxation).
+    `examples` are the positions of the students to encode, all of them by default.
+    """
+    if examples is None:
+        examples = np.arange(len(classes))
+    for h in range(1, layout.levels + 1):
+        U = examples[classes[examples] == h - 1]
+        if len(U) == 0:
+            continue
+        for B in range(2**layout.n):
+            columns = [np.full(len(U), -layout.y(B, h))]
+            if relaxed:
+                columns.append(-layout.z(U))
+            columns += [-layout.x(i, h, layout.ranks[U, i]) for i in mask_to_coalition(B)]
+            yield np.column_stack(columns)
+
+
+def clauses_c6(layout, classes, examples=None, relaxed=False):
+    """
+    if a student is in class h and doesnt validate any criteria (i,h) in B, then complementary of B is sufficient.
+    With `relaxed`, the clause of the student u only holds if z[u] is true (MaxSAT relaxation).
+    `examples` are the positions of the students to encode, all of them by default.
+    """
+    if examples is None:
+        examples = np.arange(len(classes))
+    full_coalition = 2**layout.n - 1
+    for h in range(1, layout.levels + 1):
+        U = examples[classes[examples] == h]
+        if len(U) == 0:
+            continue
+        for B in range(2**layout.n):
+            columns = [np.full(len(U), layout.y(full_coalition ^ B, h))]
+            if relaxed:
+                columns.append(-layout.z(U))
+            columns += [layout.x(i, h, layout.ranks[U, i]) for i in mask_to_coalition(B)]
+            yield np.column_stack(columns)
@@ -1,9 +1,8 @@
 from maxsat import MaxSATSolver
 from data_generator import generate_data
 from sklearn.metrics import confusion_matrix, accuracy_score, f1_score, precision_score, recall_score
-from config import data_saving_path, solution_saving_path, dimacs_saving_path, gophersat_path
+from config import data_saving_path, solution_saving_path, gophersat_path
 import config
-from time import time
 from matplotlib import pyplot as plt
 from tqdm import tqdm
 import os
@@ -33,11 +32,9 @@ def eval_parameters(params: dict = config.params, verbose_results=True, verbose_
     data_test, data_train, correct_data_train = generate_data(params, balanced=True, verbose=False, save=False)
     test_classes = list(data_test["class"])
 
-    solver = MaxSATSolver(data_train, None, dimacs_saving_path, gophersat_path)
-    tik = time()
-    solver.solve(save_solution=False, verbose=False)
-    tok = time()
-    duration = tok - tik
+    solver = MaxSATSolver(data_train, None, gophersat_path=gophersat_path)
+    sol = solver.solve(save_solution=False, verbose=False)
+    duration = sol["resolution_time"]  # of the original resolution, for a solution found in the cache
 
     # restoration rate
     train_preds = solver.predict(correct_data_train.iloc[:, :-1])
@@ -0,0 +1,240 @@
+"""
+Local-search learner for Inv-NCS, for learning sets too large for the SAT/MaxSAT formulations.
+A simulated annealing searches the profiles and the sufficient coalitions minimizing the number of misclassified
+instances. It is not exact, but every move is scored in O(m) with NumPy, so it gives a model in seconds.
+
+The model is encoded as:
+    ranks[h-1, i]  -- the profile b_h on criterion i, as the rank of the lowest validating mark among the sorted
+                      distinct marks of i (len(marks[i]) if no mark validates it), non-decreasing in h
+    family[h-1, B] -- True if the coalition B (bitmask) is sufficient at level h: each level is upward-closed,
+                      and the levels are nested (a coalition sufficient at level h is sufficient below h)
+so that an instance reaches the level h iff the coalition of the criteria it validates at level h is sufficient,
+and its class is the number of levels it reaches.
+"""
+
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from config import solution_saving_path, learning_data_path
+from preprocessing import without_column
+from data_generator import minimal_coalitions, coalitions_levels, ncs_classes
+
+MAX_CRITERIA = 20  # the sufficient coalitions are stored in tables of 2^n entries
+
+
+def validated_masks(R, ranks):
+    """
+    Returns the coalitions (bitmasks) of the criteria validated by each instance at each level (instances x levels).
+
+    Arguments:
+        R: np.ndarray -- rank of each mark among the sorted distinct marks of its criterion (instances x criteria)
+        ranks: np.ndarray -- ranks of the profiles (levels x criteria)
+    """
+    weights = np.left_shift(1, np.arange(R.shape[1]))
+    return ((R[:, None, :] >= ranks[None, :, :]) * weights).sum(axis=2)
+
+
+def _anneal(args):
+    """
+    One run of the simulated annealing, from a random model. Picklable, to be run in a process pool.
+
+    Returns:
+        np.ndarray, np.ndarray -- ranks and family of the best model found
+        int -- number of misclassified instances of the best model
+        list((float, int)) -- (time, cost) of the improvements of the best model
+    """
+    R, classes, n_marks, p, max_iter, t_start, t_end, deadline, seed = args
+    rng = np.random.default_rng(seed)
+    m, n = R.shape
+    levels = p - 1
+    masks = np.arange(1 << n)
+    start = time.time()
+
+    # random profiles, sorted along the levels, and the sole coalition of all criteria sufficient at every level
+    ranks = np.sort(rng.integers(0, n_marks + 1, size=(levels, n)), axis=0)
+    family = np.zeros((levels, 1 << n), dtype=bool)
+    family[:, -1] = True
+    V = validated_masks(R, ranks)
+    passed = family[np.arange(levels), V]  # (instances x levels)
+    predicted = passed.sum(axis=1)
+    cost = int(np.count_nonzero(predicted != classes))
+    best = (ranks.copy(), family.copy(), cost)
+    trace = [(time.time() - start, cost)]
+
+    for step in range(max_iter):
+        if cost == 0 or (deadline is not None and time.time() > deadline):
+            break
+        temperature = t_start * (t_end / t_start) ** (step / max_iter)
+        h = rng.integers(levels)
+        if rng.random() < 0.5:  # moves the profile b_h on a criterion, between the profiles of its neighbour levels
+            i = rng.integers(n)
+            low = ranks[h - 1, i] if h > 0 else 0
+            high = ranks[h + 1, i] if h < levels - 1 else n_marks[i]
+            rank = rng.integers(low, high + 1)
+            if rank == ranks[h, i]:
+                continue
+            changed = [h]
+            new_V = V[:, changed] & ~(1 << i) | (R[:, [i]] >= rank) << i
+            new_family = family[changed]
+        else:  # adds a coalition (with its supersets) to the levels up to h, or removes it (with its subsets) above h
+            B = rng.integers(1 << n)
+            rank = None
+            if family[h, B]:
+                changed = list(range(h, levels))
+                new_family = family[changed] & ((masks & ~B) != 0)
+            else:
+                changed = list(range(0, h + 1))
+                new_family = family[changed] | ((masks & B) == B)
+            new_V = V[:, changed]
+        new_passed = new_family[np.arange(len(changed)), new_V]
+        new_predicted = predicted - passed[:, changed].sum(axis=1) + new_passed.sum(axis=1)
+        new_cost = int(np.count_nonzero(new_predicted != classes))
+        delta = new_cost - cost
+        if delta <= 0 or rng.random() < np.exp(-delta / temperature):
+            if rank is not None:
+                ranks[h, i] = rank
+            V[:, changed], family[changed], passed[:, changed] = new_V, new_family, new_passed
+            predicted, cost = new_predicted, new_cost
+            if cost < best[2]:
+                best = (ranks.copy(), family.copy(), cost)
+                trace.append((time.time() - start, cost))
+    return best[0], best[1], best[2], trace
+
+
+class HeuristicNCSLearner:
+    """
+    Learns an NCS model by simulated annealing, with the solve()/predict() surface of MaxSATSolver.
+    Several runs start from random models (multi-start), in parallel processes, and the best model is kept.
+
+    Arguments:
+        n_starts: int -- number of runs, one per core by default
+        n_jobs: int -- number of processes, one per core by default (1 runs them in this process)
+        max_iter: int -- number of moves of a run
+        t_start, t_end: float -- initial and final temperatures of the geometric cooling, in misclassified instances
+        seed: int -- seed of the random generators of the runs
+    """
+
+    def __init__(
+        self,
+        data_file=learning_data_path,
+        sol_file=solution_saving_path,
+        n_starts=None,
+        n_jobs=None,
+        max_iter=20000,
+        t_start=2.0,
+        t_end=0.05,
+        seed=None,
+    ):
+        self.sol_file = sol_file
+        if type(data_file) == str:
+            self.data = pd.read_csv(data_file, index_col=0)
+        else:  # if data_file is a dataframe
+            self.data = data_file
+        self.mistakes = self.data["is_mistake"]
+        self.data = without_column(self.data, "is_mistake")
+
+        self.n = len(self.data.columns) - 1
+        self.p = max(self.data["class"]) + 1
+        assert self.n <= MAX_CRITERIA, f"The heuristic handles at most {MAX_CRITERIA} criteria"
+        self.n_starts = n_starts or os.cpu_count()
+        self.n_jobs = n_jobs or min(os.cpu_count(), self.n_starts)
+        self.max_iter = max_iter
+        self.t_start, self.t_end = t_start, t_end
+        self.seed = seed
+
+        # the profiles are searched among the marks: they are handled by their rank among the marks of their criterion
+        X = self.data.iloc[:, : self.n].to_numpy(dtype=float)
+        self.marks = [np.unique(X[:, i]) for i in range(self.n)]
+        self.R = np.column_stack([np.searchsorted(self.marks[i], X[:, i]) for i in range(self.n)])
+        self.family = None  # sufficient coalitions of the learnt model, see the header
+        self.learnt_params = {}
+
+    def solve(self, save_solution=True, verbose=True, time_limit=None):
+        """
+        Runs the simulated annealing and decodes the best model, in the format of MaxSATSolver.solve.
+        With a `time_limit` (in seconds), the runs are stopped at the deadline.
+        sol["optimal"] is only True for a model misclassifying no instance.
+        """
+        if verbose:
+            print(f"Simulated annealing: {self.n_starts} runs on {self.n_jobs} processes...")
+        start = time.time()
+        deadline = start + time_limit if time_limit is not None else None
+        classes = self.data["class"].to_numpy()
+        n_marks = np.array([len(marks) for marks in self.marks])
+        seeds = np.random.SeedSequence(self.seed).spawn(self.n_starts)
+        runs = [
+            (self.R, classes, n_marks, self.p, self.max_iter, self.t_start, self.t_end, deadline, seed) for seed in seeds
+        ]
+        if self.n_jobs == 1:
+            results = list(map(_anneal, runs))
+        else:
+            with ProcessPoolExecutor(self.n_jobs) as pool:
+                results = list(pool.map(_anneal, runs))
+        ranks, self.family, cost, trace = min(results, key=lambda result: result[2])
+        delta_t = time.time() - start
+        if verbose:
+            print(f"Solving took {delta_t:.4f} seconds")
+
+        sol = {
+            "satisfiable": True,
+            "optimal": cost == 0,
+            "cost": cost,
+            "trace": trace,
+            "costs": [result[2] for result in results],  # best cost of each run
+            "resolution_time": delta_t,
+        }
+
+        # the upper bound is the lowest mark validating the criterion, the lower bound the highest mark not validating it
+        profiles_intervals = np.zeros((self.p - 1, self.n, 2))
+        for i, marks in enumerate(self.marks):
+            extended = np.concatenate([[0], marks, [20]])
+            profiles_intervals[:, i, 0] = extended[ranks[:, i]]
+            profiles_intervals[:, i, 1] = extended[ranks[:, i] + 1]
+        sol["profiles_intervals"] = profiles_intervals.tolist()
+
+        minimal = minimal_coalitions(self.family)  # bitmasks of each level, their supersets are sufficient as well
+        sol["sufficient_coalitions"] = coalitions_levels(minimal)  # {B: [h where B is minimal sufficient at level h]}
+
+        passed = self.family[np.arange(self.p - 1), validated_masks(self.R, ranks)]
+        correct = passed.sum(axis=1) == classes
+        sol["correctly_classified"] = self.data.index[correct].tolist()
+        sol["uncorrectly_classified"] = self.data.index[~correct].tolist()
+
+        if save_solution:
+            print(f"Saving solution to {self.sol_file}")
+            # Writing the solution in a file
+            with open(self.sol_file, "w", newline="") as f:
+                f.write("Heuristic solver result:\n")
+                f.write(f"Resolution time: {sol['resolution_time']:.4f} seconds\n")
+                f.write(f"Cost over time: {[(round(t, 4), cost) for t, cost in sol['trace']]}\n")
+                f.write(f"Best cost of each run: {sol['costs']}\n")
+
+                f.write(f"Number of correctly classified instances: {len(sol['correctly_classified'])}\n")
+                f.write(f"Number of uncorrectly classified instances: {len(sol['uncorrectly_classified'])}\n")
+                f.write(f"Uncorrectly classified instances: {sol['uncorrectly_classified']}\n")
+
+                f.write("Learnt sufficient coalitions:" + "\n")
+                for coalition, levels in sol["sufficient_coalitions"].items():
+                    f.write(f"\t {coalition} at levels {levels}\n")
+
+                f.write("Learnt profiles intervals:\n")
+                for h, profile in enumerate(sol["profiles_intervals"]):
+                    f.write(f"\tProfile {h+1}: {[list(map(lambda d: round(d,2), l)) for l in profile]}\n")
+
+        self.learnt_params = {
+            "criteria": list(range(self.n)),
+            "coalitions": minimal,
+            "profiles_intervals": [
+                [(h_min + h_max) / 2 for h_min, h_max in profile] for profile in sol["profiles_intervals"]
+            ],
+        }
+        return sol
+
+    def predict(self, X: np.ndarray) -> list:
+        """
+        Classifies the instances (rows of marks) with the learnt model, level by level as in the annealing.
+        """
+        profiles = np.array(self.learnt_params["profiles_intervals"])  # (levels x criteria)
+        return ncs_classes(np.asarray(X, dtype=float), profiles, self.family).tolist()
@@ -0,0 +1,149 @@
+"""
+Counterexample-guided resolution of Inv-NCS: only a subset of the learning set is encoded.
+A small seed subset, stratified by class, is solved; the learnt model then classifies the whole learning set, and
+only the misclassified instances are added to the encoded ones, until the model is consistent (SAT) or its
+optimum is certified (MaxSAT). On large, mostly separable learning sets, the formula holds few of the instances.
+"""
+
+import time
+import numpy as np
+import pandas as pd
+from sat import SATSolver
+from maxsat import MaxSATSolver
+from separation import SeparationSATSolver
+from data_generator import sufficiency_table, ncs_classes
+from config import learning_data_path, solution_saving_path, gophersat_path
+
+SOLVERS = {"SAT": SATSolver, "Separation": SeparationSATSolver, "MaxSAT": MaxSATSolver}
+
+
+def stratified_seed(classes, size, rng):
+    """
+    Returns the sorted positions of about `size` instances drawn at random, each class in proportion to its size
+    with at least one instance.
+    """
+    positions = []
+    for c in np.unique(classes):
+        U = np.flatnonzero(classes == c)
+        positions.append(rng.choice(U, size=min(len(U), max(1, round(size * len(U) / len(classes)))), replace=False))
+    return np.sort(np.concatenate(positions))
+
+
+def learnt_classes(sol, X, p):
+    """
+    Returns the classes of the instances (rows of X) with the model of a solution, whose profiles are the middles
+    of the learnt intervals, as in the predict method of the solvers.
+    """
+    profiles = np.array([[(h_min + h_max) / 2 for h_min, h_max in profile] for profile in sol["profiles_intervals"]])
+    return ncs_classes(X, profiles, sufficiency_table(sol["sufficient_coalitions"], X.shape[1], p - 1))
+
+
+def solve_lazily(
+    solver_name="MaxSAT",
+    data_file=learning_data_path,
+    save_path=solution_saving_path,
+    gophersat_path=gophersat_path,
+    seed_size=100,
+    save_solution=True,
+    verbose=True,
+    time_limit=None,
+    random_state=None,
+    **options,
+):
+    """
+    Solves Inv-NCS by encoding the instances lazily.
+    The misclassified instances of the MaxSAT model of a subset are added by partial_fit, the SAT solvers are rebuilt
+    on the enlarged subset. The optimum of a subset is a lower bound of the optimum of the learning set, so a model
+    misclassifying no more instances of the learning set than this optimum is optimal.
+
+    Arguments:
+        solver_name: str -- "MaxSAT", "SAT" or "Separation"
+        seed_size: int -- number of instances encoded at first
+        time_limit: float -- time budget in seconds, checked between the iterations and given to the MaxSAT solver
+        random_state: int -- seed of the draw of the seed subset
+        options: dict -- options of the solver
+    Returns:
+        dict -- the solution of the last subset (see the solve method of the solver), whose (un)correctly classified
+            instances are the ones of the learning set (both empty without a model), with:
+            "certified": the model is consistent (SAT) or optimal (MaxSAT) on the learning set
+            "infeasible": a subset is not consistent (SAT), so neither is the learning set: no model is learnt
+            "encoded_instances": indexes of the encoded instances
+            "iterations": number of resolutions
+        object -- the solver of the last subset
+    """
+    assert solver_name in SOLVERS, f"Unknown solver {solver_name}, must be one of {list(SOLVERS)}"
+    if type(data_file) == str:
+        data = pd.read_csv(data_file, index_col=0)
+    else:  # if data_file is a dataframe
+        data = data_file
+    n = len(data.columns) - 1 - ("is_mistake" in data.columns)
+    p = max(data["class"]) + 1
+    X = data.iloc[:, :n].to_numpy(dtype=float)
+    classes = data["class"].to_numpy()
+    deadline = time.time() + time_limit if time_limit is not None else None
+    remaining = lambda: max(0.0, deadline - time.time()) if deadline is not None else None
+
+    encoded = stratified_seed(classes, seed_size, np.random.default_rng(random_state))
+    solver_class = SOLVERS[solver_name]
+    solver = solver_class(data.iloc[encoded], save_path, gophersat_path=gophersat_path, **options)
+    if solver_name == "MaxSAT":
+        sol = solver.solve(save_solution=False, verbose=verbose, time_limit=remaining())
+    else:
+        sol = solver.solve(save_solution=False)
+    iterations = 1
+    while True:
+        # an unsatisfiable subset, or a MaxSAT resolution stopped before it printed a model, ends the loop
+        infeasible = not sol["satisfiable"] and not sol.get("stopped", False)
+        if not sol["satisfiable"] or not sol.get("has_model", True):
+            certified, wrong = False, None
+            break
+        wrong = learnt_classes(sol, X, p) != classes
+        # a MaxSAT optimum of the subset bounds the one of the learning set, a mere incumbent does not
+        certified = np.count_nonzero(wrong) <= len(sol.get("uncorrectly_classified", [])) and sol.get("optimal", True)
+        if certified or not sol.get("optimal", True) or (deadline is not None and time.time() > deadline):
+            break
+        new = np.flatnonzero(wrong & ~np.isin(np.arange(len(data)), encoded))
+        if len(new) == 0:  # only if the decoded model misclassifies encoded instances, e.g. with discretized marks
+            break
+        encoded = np.sort(np.concatenate([encoded, new]))
+        if verbose:
+            print(f"{np.count_nonzero(wrong)} misclassified instances: {len(new)} added, {len(encoded)} encoded")
+        if solver_name == "MaxSAT":
+            sol = solver.partial_fit(data.iloc[new], save_solution=False, verbose=verbose, time_limit=remaining())
+        else:
+            solver = solver_class(data.iloc[encoded], save_path, gophersat_path=gophersat_path, **options)
+            sol = solver.solve(save_solution=False)
+        iterations += 1
+
+    sol["correctly_classified"], sol["uncorrectly_classified"] = [], []
+    if wrong is not None:
+        sol["correctly_classified"] = data.index[~wrong].tolist()
+        sol["uncorrectly_classified"] = data.index[wrong].tolist()
+    sol["certified"] = bool(certified)
+    sol["infeasible"] = infeasible
+    sol["encoded_instances"] = data.index[encoded].tolist()
+    sol["iterations"] = iterations
+    if verbose:
+        print(f"{'Certified' if certified else 'Not certified'} after {iterations} resolutions, {len(encoded)} encoded")
+
+    if save_solution:
+        print(f"Saving solution to {save_path}")
+        with open(save_path, "w", newline="") as f:
+            f.write(f"Lazy {solver_name} solver result:\n")
+            f.write("Satisfiable: " + str(sol["satisfiable"]) + "\n")
+            f.write("Certified: " + str(sol["certified"]) + "\n")
+            f.write("Infeasible: " + str(sol["infeasible"]) + "\n")
+            f.write(f"Resolutions: {sol['iterations']}\n")
+            f.write(f"Encoded instances ({len(encoded)} of {len(data)}): {sol['encoded_instances']}\n")
+            if wrong is not None:
+                f.write(f"Number of uncorrectly classified instances: {len(sol['uncorrectly_classified'])}\n")
+                f.write(f"Uncorrectly classified instances: {sol['uncorrectly_classified']}\n")
+
+            f.write("Learnt sufficient coalitions:" + "\n")
+            for coalition, levels in sol["sufficient_coalitions"].items():
+                f.write(f"\t {coalition} at levels {levels}\n")
+
+            f.write("Learnt profiles intervals:\n")
+            for h, profile in enumerate(sol["profiles_intervals"]):
+                f.write(f"\tProfile {h+1}: {[list(map(lambda d: round(d,2), l)) for l in profile]}\n")
+    return sol, solver
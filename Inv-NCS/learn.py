@@ -7,7 +7,11 @@ import os
 import pandas as pd
 from sat import SATSolver
 from maxsat import MaxSATSolver
-from config import learning_data_path, solution_saving_path, dimacs_saving_path, gophersat_path
+from separation import SeparationSATSolver
+from portfolio import solve_portfolio
+from heuristic import HeuristicNCSLearner
+from lazy import solve_lazily
+from config import learning_data_path, solution_saving_path, gophersat_path
 from pyfiglet import Figlet
 
 
@@ -15,18 +19,51 @@ def inverse_ncs(
     solver_name="MaxSAT",
     data_file=learning_data_path,
     save_path=solution_saving_path,
-    dimacs_saving_path=dimacs_saving_path,
+    dimacs_saving_path=None,
     gophersat_path=gophersat_path,
     print_solution=True,
     save_solution=True,
+    time_limit=None,
+    lazy=False,
 ):
-    assert solver_name in ["MaxSAT", "SAT"], "Solver must be either MaxSAT or SAT"
+    assert solver_name in ["MaxSAT", "SAT", "Separation", "Portfolio", "Heuristic"], "Unknown solver " + solver_name
     print(f"Learning the NCS model using {solver_name} Solver...")
+    if solver_name == "Portfolio":  # races several formulations, see portfolio.py
+        strategy, sol, _ = solve_portfolio(
+            data_file=data_file,
+            save_path=save_path,
+            gophersat_path=gophersat_path,
+            save_solution=save_solution,
+            time_limit=time_limit,
+        )
+        if print_solution:
+            print_sol(sol, strategy)
+        return sol
+    if lazy:  # encodes the instances lazily, see lazy.py
+        assert solver_name in ["MaxSAT", "SAT", "Separation"], "Lazy resolution of the MaxSAT, SAT or Separation solver"
+        sol, _ = solve_lazily(
+            solver_name,
+            data_file=data_file,
+            save_path=save_path,
+            gophersat_path=gophersat_path,
+            save_solution=save_solution,
+            time_limit=time_limit,
+        )
+        if print_solution:
+            print_sol(sol, solver_name)
+        return sol
     if solver_name == "MaxSAT":
         solver = MaxSATSolver(data_file, save_path, dimacs_saving_path, gophersat_path)
     elif solver_name == "SAT":
         solver = SATSolver(data_file, save_path, dimacs_saving_path, gophersat_path)
-    sol = solver.solve(save_solution=save_solution)
+    elif solver_name == "Separation":
+        solver = SeparationSATSolver(data_file, save_path, dimacs_saving_path, gophersat_path)
+    elif solver_name == "Heuristic":
+        solver = HeuristicNCSLearner(data_file, save_path)
+    if solver_name in ["MaxSAT", "Heuristic"]:  # anytime resolution, stopped at the time limit
+        sol = solver.solve(save_solution=save_solution, time_limit=time_limit)
+    else:
+        sol = solver.solve(save_solution=save_solution)
     if print_solution:
         print_sol(sol, solver_name)
     return sol
@@ -40,7 +77,8 @@ def print_sol(sol, solver):
     print(f"{solver} solver result:")
     print("Satisfiable: " + str(sol["satisfiable"]))
     print(f"Resolution time: {sol['resolution_time']:.4f} seconds")
-    if solver == "MaxSAT":
+    if solver.startswith("MaxSAT") or solver == "Heuristic":
+        print("Optimal: " + str(sol["optimal"]))
         print(f"Number of correctly classified instances: {len(sol['correctly_classified'])}")
         print(f"Number of uncorrectly classified instances: {len(sol['uncorrectly_classified'])}")
         print(f"Uncorrectly classified instances: {sol['uncorrectly_classified']}")
@@ -8,11 +8,19 @@ https://www.researchgate.net/publication/221367488_Learning_the_Parameters_of_a_
 import numpy as np
 import pandas as pd
 import os
-from config import solution_saving_path, learning_data_path, dimacs_saving_path, gophersat_path, solver_log_path
+from config import solution_saving_path, learning_data_path, gophersat_path, scratch_dir
+from config import cache_dir, cache_max_bytes
 import subprocess
-from itertools import combinations
+import threading
 import time
-from data_generator import ncs
+from itertools import chain
+from dimacs import DimacsWriter, scratch_directory
+from solve_cache import SolveCache
+from preprocessing import discretize_data, discretize_marks, snap_to_values, pareto_frontier, conflict_cover
+from preprocessing import without_column
+from encoding import VariableLayout, ClauseStore, clauses_c1, clauses_c2, clauses_c3, clauses_c4, clauses_c5, clauses_c6
+from encoding import violated_c3_c4
+from data_generator import minimal_coalitions, antichain_table, coalitions_levels, ncs_classes
 
 
 class MaxSATSolver:
@@ -20,24 +28,57 @@ class MaxSATSolver:
         self,
         data_file=learning_data_path,
         sol_file=solution_saving_path,
-        dimacs_file=dimacs_saving_path,
+        dimacs_file=None,
         gophersat_path=gophersat_path,
+        c1_encoding="chain",
+        discretization=None,
+        grid_step=0.5,
+        n_bins=20,
+        cache_dir=cache_dir,
+        lazy_coalitions=False,
+        merge_dominated=False,
     ):
+        assert c1_encoding in ["chain", "pairwise"], "C1 encoding must be either chain or pairwise"
+        assert discretization in [None, "grid", "quantile"], "Discretization must be either None, grid or quantile"
+        self.c1_encoding = c1_encoding
+        self.lazy_coalitions = lazy_coalitions  # C3/C4 only added once violated, see solve
+        self.discretization = discretization
+        self.grid_step = grid_step
+        self.merge_dominated = merge_dominated  # heuristic: its optimum may miss the real one, see _group_instances
         self.sol_file = sol_file
-        self.solver_log_file = solver_log_path
+        # the formula (unless a path is given) and the log are written in a working directory of the solver
+        self.work_dir = scratch_directory(self, scratch_dir)
+        self.solver_log_file = os.path.join(self.work_dir, "solver_output.log")
+        if dimacs_file is None:
+            dimacs_file = os.path.join(self.work_dir, "workingfile")
         self.dimacs_file = dimacs_file + ".wcnf"
         self.gophersat_path = gophersat_path
+        self.cache = SolveCache(cache_dir, cache_max_bytes) if cache_dir is not None else None  # see solve_cache.py
         if type(data_file) == str:
             self.data = pd.read_csv(data_file, index_col=0)
         else:  # if data_file is a dataframe
             self.data = data_file
         self.mistakes = self.data["is_mistake"]
-        self.data.drop(columns=["is_mistake"], inplace=True)
+        self.data = without_column(self.data, "is_mistake")
 
-        self.i2v = None
+        # snapping the marks bounds the number of x variables, at the cost of some separability
+        self.discretization_report = None
+        if discretization is not None:
+            self.data, self.discretization_report = discretize_data(self.data, discretization, grid_step, n_bins)
+            before, after = self.discretization_report["conflicting_pairs"]
+            print(f"Marks discretized ({discretization}): {before} -> {after} pairs of conflicting instances")
+
+        self.layout = None  # numbering of the variables
+        self.clauses = None  # ClauseStore of the formula, kept in memory for partial_fit to rewrite the weights
         self.n = None  # number of criteria
+        self.groups = None  # group of each instance, encoded by a single z variable
+        self.lower_bound = None  # lower bound of the number of misclassified instances
+        self.suspected_mistakes = None  # indexes of the instances of a minimum vertex cover of the conflicts
+        self.stopped = False  # set by stop
+        self._process = None  # running gophersat process
         self.build_model()
         self.learnt_params = {}
+        self.compiled_model = None  # profiles and table of the sufficient coalitions, see compile
 
     def build_model(self):
         # Resolution of NCS
@@ -47,123 +88,224 @@ class MaxSATSolver:
         self.n = len(self.data.columns) - 1
         self.p = p = max(self.data["class"]) + 1  # = len(profiles) + 1
 
-        criteria = range(self.n)
-
-        # make all possible combinations of criteria of all lengths
-        criteria_combinations = []
-        for i in range(0, self.n + 1):
-            criteria_combinations += list(combinations(range(self.n), i))
-
-        # X[i] = list of marks in criterion i;
-        X = np.array([self.data.iloc[:, i] for i in criteria])
-
-        counter = iter(range(1, X.size * (p - 1) + len(criteria_combinations) * (p - 1) + len(self.data.index) + 1))
-        # x[i,h,k] positive  means the mark k validates the criterion i wrt the profile b_h
-        self.x = x = {}
-        for i in criteria:
-            for h in range(1, p):
-                for k in X[i]:
-                    if (i, h, k) not in x:
-                        x[(i, h, k)] = next(counter)
-
-        # y[B, h] positive if the coalition B is sufficient at level h
-        self.y = y = {(B, h): next(counter) for B in criteria_combinations for h in range(1, p)}
-
-        # z[u] positive if u is correctly classified
-        self.z = z = {u: next(counter) for u in self.data.index}
-
-        variables = list(x.keys()) + list(y.keys()) + list(z.keys())
-        v2i = {**x, **y, **z}
-        self.i2v = {v: k for k, v in v2i.items()}
-
-        C = lambda h: self.data.index[self.data["class"] == h]  # indexes of instances belonging to class h
-
-        # if student validates a criterion i with evaluation k, then another student with criterion k'>k validates this criterion surely
-        clauses_c1 = [
-            [x[i, h, kp], -x[i, h, k]] for h in range(1, p) for i in criteria for k in X[i] for kp in X[i] if k < kp
-        ]
-
-        # if student validates a criterion i wrt the profile b_h', then he must validate the criterion i wrt the profile b_h (h < h')
-        clauses_c2 = [
-            [x[i, h, k], -x[i, hp, k]]
-            for i in criteria
-            for k in X[i]
-            for h in range(1, p)
-            for hp in range(1, p)
-            if h < hp
-        ]
-
-        # if B is sufficient then each B' containing B is sufficient
-        clauses_c3 = [
-            [y[Bp, h], -y[B, h]]
-            for h in range(1, p)
-            for B in criteria_combinations
-            for Bp in criteria_combinations
-            if set(B).issubset(set(Bp)) and set(B) != set(Bp)
-        ]
-
-        # if B is sufficient at level hp then B is sufficient at level h < hp
-        clauses_c4 = [
-            [y[B, h], -y[B, hp]] for B in criteria_combinations for h in range(1, p) for hp in range(1, p) if h < hp
-        ]
-
-        # if a student is in class h-1 and validates all criteria (i,h) in B, then B is not sufficient
-        clauses_c5_ = []
-        for h in range(1, p):
-            for B in criteria_combinations:
-                for u in C(h - 1):
-                    clauses_c5_.append([-y[B, h], -z[u]] + [-x[i, h, X[i, u]] for i in B])
-
-        # if a student is in class h and doesnt validate any criteria (i,h) in B, then complementary of B is sufficient
-        clauses_c6_ = []
-        for h in range(1, p):
-            for B in criteria_combinations:
-                B_comp = tuple([i for i in criteria if i not in B])  # complementary
-                for u in C(h):
-                    clauses_c6_.append([y[B_comp, h], -z[u]] + [x[i, h, X[i, u]] for i in B])
+        # identical examples (same marks and class) are encoded once, with a z variable weighted by their count
+        self.groups = None
+        self._group_instances()
+        representatives = self.data.iloc[self.representatives]
 
-        # maximize number of correctly classified instances(=alternative)
-        clauses_goal = [[z[u]] for u in self.data.index]
+        # marks of the groups of instances (groups x criteria) and their classes
+        X = representatives.iloc[:, : self.n].to_numpy()
+        classes = representatives["class"].to_numpy()
+
+        # x[i,h,k] positive means the mark k validates the criterion i wrt the profile b_h
+        # y[B,h] positive if the coalition B (as a bitmask) is sufficient at level h
+        # z[g] positive if the instances of the group g are correctly classified
+        self.layout = layout = VariableLayout(X, p, n_z=len(self.representatives))
+
+        self._bound_misclassifications()
 
-        self.myClauses = clauses_c1 + clauses_c2 + clauses_c3 + clauses_c4 + clauses_c5_ + clauses_c6_ + clauses_goal
         self.w_max = self.data.size + 1
         w1 = 1
-        self.weights = [self.w_max] * (len(self.myClauses) - len(clauses_goal)) + [w1] * len(clauses_goal)
 
-        self.myDimacs = self._clauses_to_dimacs(self.myClauses, self.weights, len(variables))
-        self._write_dimacs_file(self.myDimacs, self.dimacs_file)
+        # the formula stays in memory (about 4 bytes per literal and 8 per clause), as partial_fit appends to it
+        # and rewrites the file when the hard weight grows
+        self.clauses = ClauseStore()
+        for block in chain(
+            clauses_c1(layout, self.c1_encoding),
+            clauses_c2(layout),
+            [] if self.lazy_coalitions else clauses_c3(layout),
+            [] if self.lazy_coalitions else clauses_c4(layout),
+            clauses_c5(layout, classes, relaxed=True),
+            clauses_c6(layout, classes, relaxed=True),
+        ):
+            self.clauses.add(block, self.w_max)
 
-    def solve(self, save_solution=True, verbose=True):
+        # maximize number of correctly classified instances(=alternative)
+        self.clauses.add(layout.z(np.arange(layout.n_z))[:, None], w1 * np.bincount(self.groups))
+
+        with DimacsWriter(self.dimacs_file, layout.numvar, weighted=True, top=self.w_max) as writer:
+            self.clauses.write(writer)
+
+    def partial_fit(self, data, save_solution=True, verbose=True, time_limit=None, stop_at_bound=False):
+        """
+        Adds new reference assignments to the learning set and solves again.
+        The variables and clauses of the known examples are kept: only the x variables of the new marks,
+        their C1/C2 clauses and the C5/C6/goal clauses of the new groups of identical examples are added to the formula.
+
+        Arguments:
+            data: pd.DataFrame -- new examples, with the same columns as the learning set
+            time_limit: float -- time budget of the resolution in seconds, see solve
+            stop_at_bound: bool -- stops the resolution when the lower bound is reached, see solve
+        Returns:
+            dict -- the solution, see solve
+        """
+        if "is_mistake" in data.columns:
+            self.mistakes = pd.concat([self.mistakes, data["is_mistake"]])
+            data = without_column(data, "is_mistake")
+        else:
+            self.mistakes = pd.concat([self.mistakes, pd.Series(False, index=data.index, name="is_mistake")])
+        assert list(data.columns) == list(self.data.columns), "The new examples must have the same criteria"
+        if self.discretization is not None:
+            data = data.copy()
+            for i, criterion in enumerate(data.columns[: self.n]):
+                if self.discretization == "grid":
+                    data[criterion] = discretize_marks(data[criterion].to_numpy(), "grid", self.grid_step)
+                else:  # the new marks are snapped on the bins of the initial learning set
+                    data[criterion] = snap_to_values(data[criterion].to_numpy(), self.layout.marks[i])
+        m = len(self.data.index)
+        self.data = pd.concat([self.data, data])
+
+        if max(data["class"]) + 1 > self.p:  # new levels, every family of clauses changes
+            self.build_model()
+            return self.solve(save_solution, verbose, time_limit, stop_at_bound)
+
+        n_groups = len(self.representatives)
+        self._group_instances()  # the known groups keep their numbers
+        representatives = self.data.iloc[self.representatives]
+        X = representatives.iloc[:, : self.n].to_numpy()
+        classes = representatives["class"].to_numpy()
+        new_groups = np.arange(n_groups, len(self.representatives))
+        self._bound_misclassifications()
+        layout = self.layout
+        new_marks = layout.extend(X, n_z=len(new_groups))
+
+        start = len(self.clauses)
+        for block in chain(
+            clauses_c1(layout, self.c1_encoding, new_marks),
+            clauses_c2(layout, new_marks),
+            clauses_c5(layout, classes, new_groups, relaxed=True),
+            clauses_c6(layout, classes, new_groups, relaxed=True),
+        ):
+            self.clauses.add(block, self.w_max)
+        # the new instances of a known group add to its weight
+        counts = np.bincount(self.groups[m:], minlength=len(self.representatives))
+        groups = np.flatnonzero(counts)
+        self.clauses.add(layout.z(groups)[:, None], counts[groups])
+
+        if len(self.data.index) >= self.w_max:  # the hard clauses must outweigh all the soft ones together
+            weights = self.clauses.weights
+            weights[weights == self.w_max] = self.data.size + 1
+            self.w_max = self.data.size + 1
+            start = 0
+        with DimacsWriter(self.dimacs_file, layout.numvar, weighted=True, top=self.w_max, append=start > 0) as writer:
+            self.clauses.write(writer, start)
+
+        return self.solve(save_solution, verbose, time_limit, stop_at_bound)
+
+    def _group_instances(self):
+        """
+        Groups the instances encoded by a single z variable, weighted by the size of the group: the identical instances
+        (same marks and class) and, with merge_dominated, the instances of the lowest (highest) class whose marks are
+        at most (at least) as good as the ones of another instance of their class, see pareto_frontier.
+        Sets self.groups, the group of each instance, and self.representatives, the position of the instance whose
+        clauses are encoded for each group. Groups are numbered in order of first appearance of their representative.
+        Once grouped, the groups are kept: new instances are only grouped with identical ones.
+        """
+        duplicates = self.data.groupby(list(self.data.columns), sort=False).ngroup().to_numpy()
+        first = np.unique(duplicates, return_index=True)[1]  # first instance of each set of identical instances
+        if self.groups is None:
+            target = np.arange(len(first))  # set of identical instances encoded for each one
+            if self.merge_dominated:
+                # the clauses of the frontier representative imply the ones of the merged instances, but the merged
+                # instances are then forced to share its z variable: the relaxation is tighter than the original one,
+                # so this is a heuristic, whose optimum can misclassify more instances than the real one
+                X = self.data.iloc[first, : self.n].to_numpy()
+                classes = self.data["class"].to_numpy()[first]
+                for c, maximal in [(0, True), (self.p - 1, False)]:  # the only classes with only C5 or C6 clauses
+                    U = np.flatnonzero(classes == c)
+                    target[U] = U[pareto_frontier(X[U], maximal)]
+            encoded, self._duplicates_groups = np.unique(target, return_inverse=True)
+            self.representatives = first[encoded]
+        else:
+            new = first[len(self._duplicates_groups) :]
+            new_groups = len(self.representatives) + np.arange(len(new))
+            self._duplicates_groups = np.concatenate([self._duplicates_groups, new_groups])
+            self.representatives = np.concatenate([self.representatives, new])
+        self.groups = self._duplicates_groups[duplicates]
+
+    def _bound_misclassifications(self):
+        """
+        The instances of a minimum vertex cover of the dominance conflicts (see conflict_cover) can not all be sorted
+        correctly: their number bounds the optimum from below.
+        """
+        cover = conflict_cover(self.data.iloc[:, : self.n].to_numpy(), self.data["class"].to_numpy())
+        self.lower_bound = len(cover)
+        self.suspected_mistakes = self.data.index[cover].tolist()
+
+    def solve(self, save_solution=True, verbose=True, time_limit=None, stop_at_bound=False):
+        """
+        Solves the MaxSAT problem and decodes the learnt model.
+        With `lazy_coalitions`, the C3/C4 clauses violated by the optimum are added and the formula solved again, until
+        none is violated: the optimum of the formula without the other ones is then the optimum of the whole formula.
+        With a `time_limit` (in seconds), gophersat is stopped at the deadline if it has not proven optimality:
+        sol["optimal"] is then False, and sol["trace"] holds the (time, cost) of the incumbents found so far.
+        An incumbent that reaches the lower bound of the number of misclassified instances (sol["lower_bound"]) is
+        optimal: with `stop_at_bound`, gophersat is stopped as soon as it finds one, without waiting for its proof.
+        sol["bound_reached"] then tells that the optimum is known, but sol["optimal"] stays False, as the model of
+        the incumbent is not printed (see below).
+        With `merge_dominated`, the optimum found is only reported optimal if it reaches the lower bound.
+        gophersat only prints the model of the optimum, so no model is decoded for a stopped resolution:
+        sol["has_model"] is then False, the learnt model is cleared and predict fails until a resolution completes.
+        """
         # Start the solver
-        sol = self._exec_gophersat(self.dimacs_file, verbose=verbose)
-
-        # find profiles intervals
-        profiles_intervals = [[[0, 20] for _ in range(self.n)] for _ in range(self.p - 1)]
-        for var, is_satisfied in list(sol["variables"].items())[: len(self.x)]:
-            criterion, h, mark = var
-            if is_satisfied:  # marks validates criterion
-                profiles_intervals[h - 1][criterion][1] = min(profiles_intervals[h - 1][criterion][1], mark)
-            else:
-                profiles_intervals[h - 1][criterion][0] = max(profiles_intervals[h - 1][criterion][0], mark)
-        sol["profiles_intervals"] = profiles_intervals
-
-        sol["sufficient_coalitions"] = {}  # {B: [h where B is sufficient at level h]}
-        for var, is_sufficient in list(sol["variables"].items())[len(self.x) : len(self.x) + len(self.y)]:
-            B, h = var
-            if is_sufficient:
-                if B in sol["sufficient_coalitions"]:
-                    sol["sufficient_coalitions"][B].append(h)
-                else:
-                    sol["sufficient_coalitions"][B] = [h]
-
-        sol["correctly_classified"] = []  # indexes of correctly classified instances
-        sol["uncorrectly_classified"] = []  # indexes of incorrectly classified instances
-        for var, is_correctly_classified in list(sol["variables"].items())[len(self.x) + len(self.y) :]:
-            u = var
-            if is_correctly_classified:
-                sol["correctly_classified"].append(u)
-            else:
-                sol["uncorrectly_classified"].append(u)
+        # (an incumbent of the formula without all of C3/C4 may not be a model, so it is not stopped at the bound)
+        stop_cost = self.lower_bound if stop_at_bound and not self.lazy_coalitions else None
+        deadline = time.time() + time_limit if time_limit is not None else None
+        sol = self._exec_gophersat(self.dimacs_file, verbose=verbose, time_limit=time_limit, stop_cost=stop_cost)
+
+        # lazy C3/C4: the clauses violated by the optimum are added, until it satisfies all of them
+        while self.lazy_coalitions and sol["model"] is not None:
+            violated = violated_c3_c4(self.layout, sol["model"])
+            if len(violated) == 0:
+                break
+            if verbose:
+                print(f"{len(violated)} violated C3/C4 clauses added")
+            self.clauses.add(violated, self.w_max)
+            with DimacsWriter(self.dimacs_file, self.layout.numvar, weighted=True, top=self.w_max, append=True) as writer:
+                writer.write_block(violated, np.full(len(violated), self.w_max))
+            resolution_time = sol["resolution_time"]
+            time_limit = max(0.0, deadline - time.time()) if deadline is not None else None
+            sol = self._exec_gophersat(self.dimacs_file, verbose=verbose, time_limit=time_limit)
+            sol["resolution_time"] += resolution_time
+        sol["lower_bound"] = self.lower_bound
+        sol["suspected_mistakes"] = self.suspected_mistakes
+        if self.merge_dominated:  # the optimum of the tighter relaxation is only known optimal at the lower bound
+            sol["optimal"] = False
+        # the cost of an incumbent stopped at the bound is the optimum, but without its model nothing is learnt
+        sol["bound_reached"] = sol["cost"] is not None and sol["cost"] <= self.lower_bound
+        if sol["bound_reached"] and sol["model"] is not None:
+            sol["optimal"] = True
+
+        model = sol["model"]  # model[v] is the value of the variable v
+        sol["has_model"] = model is not None
+        layout = self.layout
+
+        # find profiles intervals: the upper bound is the lowest mark validating the criterion,
+        # the lower bound is the highest mark not validating it
+        profiles_intervals = np.zeros((self.p - 1, self.n, 2))
+        profiles_intervals[:, :, 1] = 20
+        if model is not None:
+            levels = np.arange(1, self.p)[:, None]
+            for i in range(self.n):
+                marks = layout.marks[i]
+                validated = model[layout.x(i, levels, np.arange(len(marks)))]  # (levels x marks)
+                profiles_intervals[:, i, 1] = np.where(validated, marks, 20).min(axis=1, initial=20)
+                profiles_intervals[:, i, 0] = np.where(validated, 0, marks).max(axis=1, initial=0)
+        sol["profiles_intervals"] = profiles_intervals.tolist()
+
+        # only the minimal sufficient coalitions of each level are kept, their supersets are sufficient as well
+        minimal = [np.zeros(0, dtype=np.int64) for _ in range(self.p - 1)]  # bitmasks of each level
+        if model is not None:
+            sufficient = model[layout.y_offset : layout.y_offset + layout.n_y].reshape(-1, layout.levels)
+            minimal = minimal_coalitions(sufficient.T)
+        sol["sufficient_coalitions"] = coalitions_levels(minimal)  # {B: [h where B is minimal sufficient at level h]}
+
+        # indexes of correctly and incorrectly classified instances
+        sol["correctly_classified"], sol["uncorrectly_classified"] = [], []
+        if model is not None:
+            correct = model[layout.z(self.groups)]  # per instance, from the z variable of its group
+            sol["correctly_classified"] = self.data.index[correct].tolist()
+            sol["uncorrectly_classified"] = self.data.index[~correct].tolist()
 
         if save_solution:
             print(f"Saving solution to {self.sol_file}")
@@ -172,6 +314,10 @@ class MaxSATSolver:
                 f.write("MaxSAT solver result:\n")
                 f.write("Satisfiable: " + str(sol["satisfiable"]) + "\n")
                 f.write(f"Resolution time: {sol['resolution_time']:.4f} seconds\n")
+                f.write("Optimal: " + str(sol["optimal"]) + "\n")
+                f.write(f"Cost over time: {[(round(t, 4), cost) for t, cost in sol['trace']]}\n")
+                f.write(f"Lower bound of the number of uncorrectly classified instances: {sol['lower_bound']}\n")
+                f.write(f"Suspected mistakes: {sol['suspected_mistakes']}\n")
 
                 f.write(f"Number of correctly classified instances: {len(sol['correctly_classified'])}\n")
                 f.write(f"Number of uncorrectly classified instances: {len(sol['uncorrectly_classified'])}\n")
@@ -185,70 +331,150 @@ class MaxSATSolver:
                 for h, profile in enumerate(sol["profiles_intervals"]):
                     f.write(f"\tProfile {h+1}: {[list(map(lambda d: round(d,2), l)) for l in profile]}\n")
 
-                # f.write("\nClauses: " + str(sol["clauses"]) + "\n")
+                # the human-readable {variable: value} dict is only built for this dump
+                sol["variables"] = (
+                    {layout.decode(v): bool(model[v]) for v in range(1, layout.numvar + 1)} if model is not None else {}
+                )
                 f.write("Satisfiable clauses: \n")
                 for c in sol["variables"]:
                     f.write("\t" + str(c) + ": " + str(sol["variables"][c]) + "\n")
 
-        self.learnt_params = {
-            "criteria": list(range(self.n)),
-            "coalitions": sol["sufficient_coalitions"],
-            "profiles_intervals": [
-                [(h_min + h_max) / 2 for h_min, h_max in profile] for profile in sol["profiles_intervals"]
-            ],
-        }
+        # an empty model would sort every instance in the class 0, so a stopped resolution leaves no learnt model
+        self.learnt_params, self.compiled_model = {}, None
+        if model is not None:
+            self.learnt_params = {
+                "criteria": list(range(self.n)),
+                "coalitions": minimal,
+                "profiles_intervals": [
+                    [(h_min + h_max) / 2 for h_min, h_max in profile] for profile in sol["profiles_intervals"]
+                ],
+            }
+            self.compile()
         return sol
 
+    def compile(self):
+        """
+        Compiles the learnt model for predict: the profiles as an array, and the table (levels x 2^n) telling for each
+        level whether a coalition (bitmask) contains one of its minimal sufficient coalitions (see antichain_table).
+        An instance is then classified by comparing its marks to the profiles and one lookup per level.
+
+        Returns:
+            np.ndarray, np.ndarray -- profiles and table of the sufficient coalitions
+        """
+        assert self.learnt_params, "No model was learnt, the last resolution was stopped before gophersat printed one"
+        profiles = np.array(self.learnt_params["profiles_intervals"])
+        table = antichain_table(self.learnt_params["coalitions"], self.n)
+        self.compiled_model = (profiles, table)
+        return self.compiled_model
+
     def predict(self, X: np.ndarray) -> list:
-        predicted_classes = X.apply(self._predict_instance, axis=1, args=(self.learnt_params,)).to_list()
-        return predicted_classes
-
-    def _predict_instance(self, marks, params):
-        criteria, coalitions, profiles = params["criteria"], params["coalitions"], params["profiles_intervals"]
-        return ncs(marks, criteria, coalitions, profiles)
-
-    def _clauses_to_dimacs(self, clauses, weights, numvar):
-        # Convert a list of clauses to a DIMACS format
-        # more info: http://www.maxsat.udl.cat/08/index.php?disp=requirements
-        # dimacs = "c This is it\np wcnf " + str(numvar) + " " + str(len(clauses)) + "\n"  # Weighted Max-SAT
-        dimacs = "c This is it\np wcnf " + str(numvar) + " " + str(len(clauses)) + " " + str(self.w_max) + "\n" # Weigthed Partial Max-SAT
-        for clause, w in zip(clauses, weights):
-            dimacs += str(w) + " " + " ".join(map(str, clause)) + " 0\n"
-        return dimacs
-
-    def _write_dimacs_file(self, dimacs, filename):
-        with open(filename, "w", newline="") as cnf:
-            cnf.write(dimacs)
-
-    def _exec_gophersat(self, filename, encoding="utf8", verbose=True):
+        """
+        Classifies the instances (rows of marks) with the compiled model (see ncs_classes).
+        """
+        if self.compiled_model is None:
+            self.compile()
+        profiles, table = self.compiled_model
+        return ncs_classes(np.asarray(X, dtype=float), profiles, table).tolist()
+
+    def _parse_model(self, line):
+        """
+        Parses the gophersat model line `v x1 -x2 ...` into a boolean vector indexed by the variables.
+        """
+        literals = np.array(line[2:].replace("x", "").split(), dtype=np.int64)
+        model = np.zeros(self.layout.numvar + 1, dtype=bool)
+        model[np.abs(literals)] = literals > 0
+        return model
+
+    def stop(self):
+        """
+        Kills the running gophersat process (or the next one to start), to cancel the resolution from another thread.
+        The resolution then ends as if its time limit was reached.
+        """
+        self.stopped = True
+        if self._process is not None:
+            self._process.kill()
+
+    def _exec_gophersat(self, filename, encoding="utf8", verbose=True, time_limit=None, stop_cost=None):
+        key = self.cache.key(filename, self.gophersat_path, ["--verbose"]) if self.cache is not None else None
+        result = self.cache.get(key) if key is not None else None
+        if result is not None:
+            if verbose:
+                print(f"Solution found in the cache ({result['resolution_time']:.4f} seconds to solve)")
+            return result
+        result = self._run_gophersat(filename, encoding, verbose, time_limit, stop_cost)
+        if key is not None and not result["stopped"]:  # only the complete resolutions are kept
+            self.cache.put(key, result)
+        return result
+
+    def _run_gophersat(self, filename, encoding="utf8", verbose=True, time_limit=None, stop_cost=None):
         cmd = self.gophersat_path
         if verbose:
             print(f"Solving with {cmd}...")
         start = time.time()
-        result = subprocess.run([cmd, "--verbose", filename], stdout=subprocess.PIPE, check=True, encoding=encoding)
+        process = subprocess.Popen([cmd, "--verbose", filename], stdout=subprocess.PIPE, encoding=encoding)
+        self._process = process
+        stopped = threading.Event()
+        if self.stopped:
+            stopped.set()
+            process.kill()
+
+        def stop():
+            stopped.set()
+            process.kill()
+
+        timer = threading.Timer(time_limit, stop) if time_limit is not None else None
+        if timer is not None:
+            timer.start()
+
+        # the output is read as it is produced, to follow the incumbents `o <cost>` of the resolution
+        lines = []
+        trace = []  # (time, cost) of the successive incumbents
+        status, model = None, None
+        try:
+            for line in process.stdout:
+                lines.append(line)
+                if line[0] == "o":
+                    trace.append((time.time() - start, int(line[2:])))
+                    if verbose:
+                        print(f"\t{trace[-1][0]:.4f}s: {trace[-1][1]} unsatisfied soft clauses")
+                    if stop_cost is not None and trace[-1][1] <= stop_cost:
+                        stop()
+                elif line[0] == "s":
+                    status = line[2:].strip()
+                elif line[0] == "v" and status == "OPTIMUM FOUND":
+                    model = self._parse_model(line)
+            process.wait()
+        finally:
+            if timer is not None:
+                timer.cancel()
         delta_t = time.time() - start
         if verbose:
             print(f"Solving took {delta_t:.4f} seconds")
-        string = str(result.stdout)
         with open(self.solver_log_file, "w", newline="") as f:
-            f.write(string)
-        lines = string.splitlines()
-
-        for i, line in enumerate(lines):
-            if line[0] == "s":
-                if line[2:] != "OPTIMUM FOUND":
-                    return {
-                        "satisfiable": False,
-                        "variables": {},
-                        "resolution_time": delta_t,
-                    }
-                else:
-                    variables = lines[i + 1][2:].split(" ")
-                    variables = [int(x.replace("x", "")) for x in variables if x != ""]
-                    return {
-                        "satisfiable": True,
-                        "variables": {self.i2v[abs(v)]: v > 0 for v in variables},
-                        "resolution_time": delta_t,
-                    }
-        raise Exception(f"Error in output format. Please check {self.solver_log_file}")
-
+            f.write("".join(lines))
+
+        if (stopped.is_set() or self.stopped) and status is None:
+            if verbose:
+                print(f"Resolution stopped, best cost found: {trace[-1][1] if trace else None}")
+            return {
+                "satisfiable": bool(trace),  # an incumbent satisfies the hard clauses
+                "model": None,
+                "optimal": False,
+                "stopped": True,
+                "cost": trace[-1][1] if trace else None,
+                "trace": trace,
+                "resolution_time": delta_t,
+            }
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, [cmd, "--verbose", filename])
+        if status is None or (status == "OPTIMUM FOUND" and model is None):
+            raise Exception(f"Error in output format. Please check {self.solver_log_file}")
+        return {
+            "satisfiable": status == "OPTIMUM FOUND",
+            "model": model,
+            "optimal": status == "OPTIMUM FOUND",
+            "stopped": False,
+            "cost": trace[-1][1] if trace else None,
+            "trace": trace,
+            "resolution_time": delta_t,
+        }
@@ -0,0 +1,115 @@
+"""
+Portfolio resolution of Inv-NCS: the instance is encoded with several formulations, each one solved by its own
+gophersat process (so on separate cores), and the first conclusive answer is kept while the other resolutions are
+stopped. Solve times vary a lot between formulations from one instance to another, racing them cuts the slow cases.
+"""
+
+import os
+import time
+import threading
+import pandas as pd
+from sat import SATSolver
+from maxsat import MaxSATSolver
+from separation import SeparationSATSolver
+from config import learning_data_path, solution_saving_path, gophersat_path
+
+# {name: (solver class, options of the solver)}
+STRATEGIES = {
+    "SAT": (SATSolver, {}),  # conclusive on noise-free data only
+    "Separation": (SeparationSATSolver, {}),  # conclusive on noise-free data only, no coalition variables
+    "MaxSAT": (MaxSATSolver, {}),
+    "MaxSAT-pairwise": (MaxSATSolver, {"c1_encoding": "pairwise"}),
+}
+
+
+def is_conclusive(sol):
+    """
+    A SAT resolution is conclusive if it sorts every instance correctly, a MaxSAT one if its optimum is proven.
+    """
+    if isinstance(sol, Exception):
+        return False
+    return sol["optimal"] if "optimal" in sol else sol["satisfiable"]
+
+
+def solve_portfolio(
+    strategies=("SAT", "Separation", "MaxSAT"),
+    data_file=learning_data_path,
+    save_path=solution_saving_path,
+    gophersat_path=gophersat_path,
+    save_solution=True,
+    time_limit=None,
+):
+    """
+    Races the strategies and returns the first conclusive solution. Without any, for instance when the time limit
+    is reached, the best MaxSAT solution with a model is returned, or else the first solution obtained.
+    gophersat does not print the model of an incumbent, so a MaxSAT resolution stopped early has none.
+    Each strategy works in its own scratch directory and saves its solution to a file suffixed with its name.
+
+    Arguments:
+        strategies: list(str) -- names of the strategies, see STRATEGIES
+        time_limit: float -- time budget in seconds, after which every resolution is stopped
+    Returns:
+        str -- name of the strategy of the solution
+        dict -- the solution, see the solve method of its solver
+        object -- the solver, to predict with the learnt model
+    """
+    for name in strategies:
+        assert name in STRATEGIES, f"Unknown strategy {name}, must be one of {list(STRATEGIES)}"
+    if type(data_file) == str:
+        data = pd.read_csv(data_file, index_col=0)
+    else:  # if data_file is a dataframe
+        data = data_file
+    root, extension = os.path.splitext(save_path)
+
+    solvers = {}
+    results = {}  # {name: solution, or the exception raised by the strategy}
+    race = threading.Condition()
+    finished = threading.Event()  # set once the race is over, the strategies still running are stopped
+
+    def run(name):
+        solver_class, options = STRATEGIES[name]
+        try:
+            solver = solver_class(data, f"{root}_{name}{extension}", gophersat_path=gophersat_path, **options)
+            with race:
+                solvers[name] = solver
+                if finished.is_set():
+                    solver.stop()
+            result = solver.solve(save_solution=save_solution)
+        except Exception as e:
+            result = e
+        with race:
+            results[name] = result
+            race.notify()
+
+    threads = [threading.Thread(target=run, args=(name,), daemon=True) for name in strategies]
+    for thread in threads:
+        thread.start()
+
+    deadline = time.time() + time_limit if time_limit is not None else None
+    with race:
+        winner = None
+        while winner is None and len(results) < len(strategies):
+            remaining = deadline - time.time() if deadline is not None else None
+            if remaining is not None and remaining <= 0:
+                break
+            race.wait(remaining)
+            winner = next((name for name in results if is_conclusive(results[name])), None)
+        finished.set()
+        for name, solver in solvers.items():
+            if name != winner:
+                solver.stop()
+    for thread in threads:
+        thread.join()
+
+    if winner is None:
+        incumbents = [name for name in results if not isinstance(results[name], Exception) and "cost" in results[name]]
+        incumbents = [name for name in incumbents if results[name]["cost"] is not None and results[name]["has_model"]]
+        if incumbents:
+            winner = min(incumbents, key=lambda name: results[name]["cost"])
+        else:
+            solutions = [name for name in strategies if not isinstance(results[name], Exception)]
+            if not solutions:
+                raise results[strategies[0]]
+            winner = solutions[0]
+    print(f"Portfolio solved by {winner} ({'conclusive' if is_conclusive(results[winner]) else 'not conclusive'})")
+    return winner, results[winner], solvers[winner]
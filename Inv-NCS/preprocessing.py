@@ -0,0 +1,162 @@
+"""
+Preprocessing of the learning set before its encoding by the solvers.
+The x variables are keyed by the distinct marks of each criterion, so snapping the marks to a finite set of values
+bounds the size of the formula regardless of the size of the learning set.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import maximum_bipartite_matching, breadth_first_order
+
+BLOCK_ROWS = 1024  # examples compared at once by dominance_conflicts and pareto_frontier
+
+
+def without_column(data, column):
+    """
+    Returns the dataframe without a column. Unlike DataFrame.drop, which copies the whole frame, the other columns
+    are shared with `data`: the solvers never write to their learning set, so the caller's dataframe is left untouched.
+    """
+    return pd.DataFrame({c: data[c] for c in data.columns if c != column}, copy=False)
+
+
+def discretize_marks(X, method="grid", grid_step=0.5, n_bins=20):
+    """
+    Snaps the marks to a finite set of values.
+
+    Arguments:
+        X: np.ndarray -- marks of the examples (examples x criteria)
+        method: str -- "grid" rounds the marks to a multiple of `grid_step`, "quantile" replaces each mark by the mean
+            of its quantile bin among the `n_bins` bins of its criterion
+    Returns:
+        np.ndarray -- the snapped marks
+    """
+    if method == "grid":
+        return np.round(X / grid_step) * grid_step
+    snapped = np.empty(X.shape)
+    for i in range(X.shape[1]):
+        edges = np.quantile(X[:, i], np.linspace(0, 1, n_bins + 1)[1:-1])
+        bins = np.searchsorted(edges, X[:, i], side="right")
+        sizes = np.bincount(bins, minlength=n_bins)
+        means = np.bincount(bins, X[:, i], minlength=n_bins) / np.maximum(sizes, 1)
+        snapped[:, i] = means[bins]
+    return snapped
+
+
+def snap_to_values(x, values):
+    """
+    Replaces each mark of x by the closest of the sorted `values`, used to snap new marks on known bins.
+    """
+    if len(values) == 1:
+        return np.full(len(x), values[0])
+    right = np.clip(np.searchsorted(values, x), 1, len(values) - 1)
+    left = right - 1
+    return np.where(np.abs(x - values[left]) <= np.abs(values[right] - x), values[left], values[right])
+
+
+def dominance_conflicts(X, classes):
+    """
+    Returns the pairs of positions (a, b) such that b is assigned to a lower class than a while having marks at least
+    as good on every criterion: no NCS model can sort both of them correctly.
+    """
+    conflicts_a, conflicts_b = [], []
+    for start in range(0, len(X), BLOCK_ROWS):
+        a = np.arange(start, min(start + BLOCK_ROWS, len(X)))
+        conflict = (classes[a, None] > classes[None, :]) & np.all(X[None, :, :] >= X[a, None, :], axis=2)
+        rows, b = np.nonzero(conflict)
+        conflicts_a.append(a[rows])
+        conflicts_b.append(b)
+    return np.concatenate(conflicts_a), np.concatenate(conflicts_b)
+
+
+def conflict_cover(X, classes):
+    """
+    Returns the sorted positions of a minimum vertex cover of the dominance conflict graph (see dominance_conflicts):
+    the fewest examples to set aside so that the others can be sorted by a monotone model. Its size is a lower bound
+    of the number of examples misclassified by any NCS model, and its examples are the suspected mistakes.
+    The conflict relation is transitive, so the minimum vertex cover is the complement of a maximum antichain, whose
+    size is given by a maximum matching of the bipartite graph (a -> b) (Dilworth and Konig theorems).
+    """
+    m = len(X)
+    a, b = dominance_conflicts(X, classes)
+    match = maximum_bipartite_matching(csr_matrix((np.ones(len(a)), (a, b)), shape=(m, m)), perm_type="column")
+    matched = np.flatnonzero(match >= 0)
+
+    # Konig: vertices reachable from the unmatched rows (node 2m links to them) by alternating paths,
+    # rows -> columns along the conflicts, columns -> rows along the matching
+    sources = np.flatnonzero(match < 0)
+    tails = np.concatenate([a, m + match[matched], np.full(len(sources), 2 * m)])
+    heads = np.concatenate([m + b, matched, sources])
+    alternating = csr_matrix((np.ones(len(tails)), (tails, heads)), shape=(2 * m + 1, 2 * m + 1))
+    reachable = np.zeros(2 * m + 1, dtype=bool)
+    reachable[breadth_first_order(alternating, 2 * m, directed=True, return_predecessors=False)] = True
+
+    # the bipartite cover is made of the rows not reachable and the columns reachable
+    return np.flatnonzero(~reachable[:m] | reachable[m : 2 * m])
+
+
+def pareto_frontier(X, maximal=True):
+    """
+    Returns, for each row of X, the position of a row of the Pareto frontier that is at least as good on every
+    criterion (maximal=True) or at most as good (maximal=False): the row itself if it is on the frontier.
+    Of identical rows, only the first one is on the frontier.
+    """
+    Y = X if maximal else -X
+    positions = np.arange(len(Y))
+    on_frontier = np.ones(len(Y), dtype=bool)
+    for start in range(0, len(Y), BLOCK_ROWS):
+        a = positions[start : start + BLOCK_ROWS]
+        dominating = np.all(Y[None, :, :] >= Y[a, None, :], axis=2)  # dominating[j, b]: b is as good as a[j]
+        identical = np.all(Y[None, :, :] == Y[a, None, :], axis=2)
+        on_frontier[a] = ~np.any(dominating & (~identical | (positions[None, :] < a[:, None])), axis=1)
+
+    frontier = positions[on_frontier]
+    representatives = np.empty(len(Y), dtype=np.int64)
+    for start in range(0, len(Y), BLOCK_ROWS):
+        a = positions[start : start + BLOCK_ROWS]
+        dominating = np.all(Y[None, frontier, :] >= Y[a, None, :], axis=2)
+        representatives[a] = frontier[dominating.argmax(axis=1)]
+    return representatives
+
+
+def frontier_examples(X, classes, maximal=True):
+    """
+    Returns the sorted positions of the examples on the Pareto frontier of their class (see pareto_frontier).
+    The C5 clauses of an example are implied (through C1) by the ones of an example of its class with better marks,
+    so only the maximal examples are needed. Conversely, only the minimal examples are needed for C6.
+    """
+    positions = []
+    for c in np.unique(classes):
+        U = np.flatnonzero(classes == c)
+        positions.append(U[np.unique(pareto_frontier(X[U], maximal))])
+    return np.sort(np.concatenate(positions))
+
+
+def discretize_data(data, method="grid", grid_step=0.5, n_bins=20):
+    """
+    Snaps the marks of a learning set (marks + class columns), see discretize_marks, and measures the loss of
+    separability: the pairs of examples that no NCS model can sort together correctly, before and after.
+
+    Returns:
+        pd.DataFrame -- the learning set with the snapped marks
+        dict -- {"conflicting_pairs": (before, after), "new_conflicting_instances": [index of the instances involved
+            in a conflict created by the discretization]}
+    """
+    n = len(data.columns) - 1
+    X = data.iloc[:, :n].to_numpy(dtype=float)
+    classes = data["class"].to_numpy()
+    snapped = discretize_marks(X, method, grid_step, n_bins)
+
+    before = dominance_conflicts(X, classes)
+    after = dominance_conflicts(snapped, classes)
+    involved_before = np.union1d(*before)
+    involved_after = np.union1d(*after)
+    new_instances = np.setdiff1d(involved_after, involved_before)
+
+    discretized = data.copy()
+    discretized.iloc[:, :n] = snapped
+    report = {
+        "conflicting_pairs": (len(before[0]), len(after[0])),
+        "new_conflicting_instances": data.index[new_instances].tolist(),
+    }
+    return discretized, report
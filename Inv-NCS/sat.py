@@ -8,10 +8,17 @@ https://www.researchgate.net/publication/221367488_Learning_the_Parameters_of_a_
 import numpy as np
 import pandas as pd
 import os
-from config import solution_saving_path, learning_data_path, dimacs_saving_path, gophersat_path, solver_log_path
+from config import solution_saving_path, learning_data_path, gophersat_path, scratch_dir
+from config import cache_dir, cache_max_bytes
 import subprocess
-from itertools import combinations
 import time
+from itertools import chain
+from dimacs import DimacsWriter, scratch_directory
+from solve_cache import SolveCache
+from preprocessing import discretize_data, frontier_examples, without_column
+from encoding import VariableLayout, clauses_c1, clauses_c2, clauses_c3, clauses_c4, clauses_c5, clauses_c6
+from encoding import violated_c3_c4
+from data_generator import minimal_coalitions, coalitions_levels
 
 
 class SATSolver:
@@ -19,23 +26,49 @@ class SATSolver:
         self,
         data_file=learning_data_path,
         sol_file=solution_saving_path,
-        dimacs_file=dimacs_saving_path,
+        dimacs_file=None,
         gophersat_path=gophersat_path,
+        c1_encoding="chain",
+        discretization=None,
+        grid_step=0.5,
+        n_bins=20,
+        cache_dir=cache_dir,
+        lazy_coalitions=False,
     ):
+        assert c1_encoding in ["chain", "pairwise"], "C1 encoding must be either chain or pairwise"
+        assert discretization in [None, "grid", "quantile"], "Discretization must be either None, grid or quantile"
+        self.c1_encoding = c1_encoding
+        self.lazy_coalitions = lazy_coalitions  # C3/C4 only added once violated, see solve
+        self.discretization = discretization
+        self.grid_step = grid_step
         self.sol_file = sol_file
-        self.solver_log_file = solver_log_path
+        # the formula (unless a path is given) and the log are written in a working directory of the solver
+        self.work_dir = scratch_directory(self, scratch_dir)
+        self.solver_log_file = os.path.join(self.work_dir, "solver_output.log")
+        if dimacs_file is None:
+            dimacs_file = os.path.join(self.work_dir, "workingfile")
         self.dimacs_file = dimacs_file + ".cnf"
         self.gophersat_path = gophersat_path
+        self.cache = SolveCache(cache_dir, cache_max_bytes) if cache_dir is not None else None  # see solve_cache.py
         if type(data_file) == str:
             self.data = pd.read_csv(data_file, index_col=0)
         else:  # if data_file is a dataframe
             self.data = data_file
         self.mistakes = self.data["is_mistake"]
-        self.data.drop(columns=["is_mistake"], inplace=True)
+        self.data = without_column(self.data, "is_mistake")
 
-        self.i2v = None
+        # snapping the marks bounds the number of x variables, at the cost of some separability
+        self.discretization_report = None
+        if discretization is not None:
+            self.data, self.discretization_report = discretize_data(self.data, discretization, grid_step, n_bins)
+            before, after = self.discretization_report["conflicting_pairs"]
+            print(f"Marks discretized ({discretization}): {before} -> {after} pairs of conflicting instances")
+
+        self.layout = None  # numbering of the variables
         self.y_vars_start = None  # index of the first y variable
         self.n = None  # number of criteria
+        self.stopped = False  # set by stop
+        self._process = None  # running gophersat process
         self.build_model()
 
     def build_model(self):
@@ -46,88 +79,46 @@ class SATSolver:
         self.n = len(self.data.columns) - 1
         self.p = p = max(self.data["class"]) + 1  # = len(profiles) + 1
 
-        criteria = range(self.n)
-
-        # make all possible combinations of criteria of all lengths
-        criteria_combinations = []
-        for i in range(0, self.n + 1):
-            criteria_combinations += list(combinations(range(self.n), i))
-
-        # X[i] = list of marks of instance in criterion i;
-        X = np.array([self.data.iloc[:, i] for i in criteria])
-
-        counter = iter(range(1, X.size * p + len(criteria_combinations) * p + 1))
-        # x[i,h,k] positive  means the mark k validates the criterion i wrt the profile b_h
-        x = {}
-        for i in criteria:
-            for h in range(1, p):
-                for k in X[i]:
-                    if (i, h, k) not in x:
-                        x[(i, h, k)] = next(counter)
-
-        # y[B, h] positive if the coalition B is sufficient at level h
-        y = {(B, h): next(counter) for B in criteria_combinations for h in range(1, p)}
-
-        variables = list(x.keys()) + list(y.keys())
-        v2i = {**x, **y}
-        self.i2v = {v: k for k, v in v2i.items()}
-        self.y_vars_start = len(x)
-
-        C = lambda h: self.data.index[self.data["class"] == h]  # indexes of instances belonging to class h
-
-        # if student validates a criterion i with evaluation k, then another student with criterion k'>k validates this criterion surely
-        clauses_c1 = [
-            [x[i, h, kp], -x[i, h, k]] for h in range(1, p) for i in criteria for k in X[i] for kp in X[i] if k < kp
-        ]
-
-        # if student validates a criterion i wrt the profile b_h', then he must validate the criterion i wrt the profile b_h (h < h')
-        clauses_c2 = [
-            [x[i, h, k], -x[i, hp, k]]
-            for i in criteria
-            for k in X[i]
-            for h in range(1, p)
-            for hp in range(1, p)
-            if h < hp
-        ]
-
-        # if B is sufficient then each B' containing B is sufficient
-        clauses_c3 = [
-            [y[Bp, h], -y[B, h]]
-            for h in range(1, p)
-            for B in criteria_combinations
-            for Bp in criteria_combinations
-            if set(B).issubset(set(Bp)) and set(B) != set(Bp)
-        ]
-
-        # if B is sufficient at level hp then B is sufficient at level h < hp
-        clauses_c4 = [
-            [y[B, h], -y[B, hp]] for B in criteria_combinations for h in range(1, p) for hp in range(1, p) if h < hp
-        ]
-
-        # if a student is in class h-1 and validates all criteria (i,h) in B, then B is not sufficient
-        clauses_c5 = []
-        for h in range(1, p):
-            for B in criteria_combinations:
-                for u in C(h - 1):
-                    clauses_c5.append([-y[B, h]] + [-x[i, h, X[i, u]] for i in B])
-
-        # if a student is in class h and doesnt validate any criteria (i,h) in B, then complementary of B is sufficient
-        clauses_c6 = []
-        for h in range(1, p):
-            for B in criteria_combinations:
-                B_comp = tuple([i for i in criteria if i not in B])  # complementary
-                for u in C(h):
-                    clauses_c6.append([y[B_comp, h]] + [x[i, h, X[i, u]] for i in B])
-
-        self.myClauses = clauses_c1 + clauses_c2 + clauses_c3 + clauses_c4 + clauses_c5 + clauses_c6
-
-        self.myDimacs = self._clauses_to_dimacs(self.myClauses, len(variables))
-        self._write_dimacs_file(self.myDimacs, self.dimacs_file)
+        # marks of the instances (instances x criteria) and their classes
+        X = self.data.iloc[:, : self.n].to_numpy()
+        classes = self.data["class"].to_numpy()
+
+        # x[i,h,k] positive means the mark k validates the criterion i wrt the profile b_h
+        # y[B,h] positive if the coalition B (as a bitmask) is sufficient at level h
+        self.layout = layout = VariableLayout(X, p)
+        self.y_vars_start = layout.n_x
+
+        # the blocks of clauses are written as they are generated, the formula is not kept in memory
+        with DimacsWriter(self.dimacs_file, layout.numvar) as writer:
+            for block in chain(
+                clauses_c1(layout, self.c1_encoding),
+                clauses_c2(layout),
+                [] if self.lazy_coalitions else clauses_c3(layout),
+                [] if self.lazy_coalitions else clauses_c4(layout),
+                clauses_c5(layout, classes, frontier_examples(X, classes, maximal=True)),
+                clauses_c6(layout, classes, frontier_examples(X, classes, maximal=False)),
+            ):
+                writer.write_block(block)
 
     def solve(self, save_solution=True):
         # Start the solver
         sol = self._exec_gophersat(self.dimacs_file)
 
+        # lazy C3/C4: the clauses violated by the model are added, until it satisfies all of them
+        while self.lazy_coalitions and self.layout.n_y > 0 and sol["satisfiable"]:
+            model = np.zeros(self.layout.numvar + 1, dtype=bool)
+            literals = np.array(sol["clauses"])
+            model[literals[literals > 0]] = True
+            violated = violated_c3_c4(self.layout, model)
+            if len(violated) == 0:
+                break
+            print(f"{len(violated)} violated C3/C4 clauses added")
+            with DimacsWriter(self.dimacs_file, self.layout.numvar, append=True) as writer:
+                writer.write_block(violated)
+            resolution_time = sol["resolution_time"]
+            sol = self._exec_gophersat(self.dimacs_file)
+            sol["resolution_time"] += resolution_time
+
         # find profiles intervals
         profiles_intervals = [[[0, 20] for _ in range(self.n)] for _ in range(self.p - 1)]
         for var, is_satisfied in list(sol["variables"].items())[: self.y_vars_start]:
@@ -138,14 +129,7 @@ class SATSolver:
                 profiles_intervals[h - 1][criterion][0] = max(profiles_intervals[h - 1][criterion][0], mark)
         sol["profiles_intervals"] = profiles_intervals
 
-        sol["sufficient_coalitions"] = {} # {B: [h where B is sufficient at level h]}
-        for var, is_sufficient in list(sol["variables"].items())[self.y_vars_start :]:
-            B, h = var
-            if is_sufficient:
-                if B in sol["sufficient_coalitions"]:
-                    sol["sufficient_coalitions"][B].append(h)
-                else:
-                    sol["sufficient_coalitions"][B] = [h]
+        sol["sufficient_coalitions"] = self._sufficient_coalitions(sol["variables"])
 
         if save_solution:
             print(f"Saving solution to {self.sol_file}")
@@ -170,43 +154,73 @@ class SATSolver:
 
         return sol
 
-    def _clauses_to_dimacs(self, clauses, numvar):
-        dimacs = "c This is it\np cnf " + str(numvar) + " " + str(len(clauses)) + "\n"
-        for clause in clauses:
-            for atom in clause:
-                dimacs += str(atom) + " "
-            dimacs += "0\n"
-        return dimacs
-
-    def _write_dimacs_file(self, dimacs, filename):
-        with open(filename, "w", newline="") as cnf:
-            cnf.write(dimacs)
+    def _sufficient_coalitions(self, variables):
+        # Only the minimal ones are kept, their supersets are sufficient as well.
+        sufficient = np.zeros((self.p - 1, 1 << self.n), dtype=bool)
+        for var, is_sufficient in list(variables.items())[self.y_vars_start :]:
+            mask, h = var
+            sufficient[h - 1, mask] = is_sufficient
+        return coalitions_levels(minimal_coalitions(sufficient))  # {B: [h where B is minimal sufficient at level h]}
+
+    def _decode_variable(self, var):
+        return self.layout.decode(var)
+
+    def stop(self):
+        """
+        Kills the running gophersat process (or the next one to start), to cancel the resolution from another thread.
+        """
+        self.stopped = True
+        if self._process is not None:
+            self._process.kill()
 
     def _exec_gophersat(self, filename, encoding="utf8"):
+        key = self.cache.key(filename, self.gophersat_path) if self.cache is not None else None
+        result = self.cache.get(key) if key is not None else None
+        if result is not None:
+            print(f"Solution found in the cache ({result['resolution_time']:.4f} seconds to solve)")
+        else:
+            result = self._run_gophersat(filename, encoding)
+            if key is not None:
+                self.cache.put(key, result)
+
+        if not result["satisfiable"]:
+            return {
+                "satisfiable": False,
+                "clauses": [],
+                "variables": {},
+                "resolution_time": result["resolution_time"],
+            }
+        literals = result["literals"].tolist()
+        return {
+            "satisfiable": True,
+            "clauses": literals,
+            "variables": {self._decode_variable(abs(v)): v > 0 for v in literals},
+            "resolution_time": result["resolution_time"],
+        }
+
+    def _run_gophersat(self, filename, encoding="utf8"):
+        """
+        Runs gophersat and returns its raw result: the literals of the model, not decoded.
+        """
         cmd = self.gophersat_path
         print(f"Solving with {cmd}...")
         start = time.time()
-        result = subprocess.run([cmd, filename], stdout=subprocess.PIPE, check=True, encoding=encoding)
+        self._process = subprocess.Popen([cmd, filename], stdout=subprocess.PIPE, encoding=encoding)
+        if self.stopped:
+            self._process.kill()
+        stdout = self._process.communicate()[0]
+        if self.stopped:
+            raise Exception("Resolution stopped")
+        if self._process.returncode != 0:
+            raise subprocess.CalledProcessError(self._process.returncode, [cmd, filename])
         delta_t = time.time() - start
         print(f"Solving took {delta_t:.4f} seconds")
-        string = str(result.stdout)        
+        string = str(stdout)
         with open(self.solver_log_file, "w", newline="") as f:
             f.write(string)
         lines = string.splitlines()
 
         if lines[1] != "s SATISFIABLE":
-            return {
-                "satisfiable": False,
-                "clauses": [],
-                "variables": {},
-                "resolution_time": delta_t,
-            }
-
-        model = lines[2][2:].split(" ")
-
-        return {
-            "satisfiable": True,
-            "clauses": [int(x) for x in model if int(x) != 0],
-            "variables": {self.i2v[abs(int(v))]: int(v) > 0 for v in model if int(v) != 0},
-            "resolution_time": delta_t,
-        }
+            return {"satisfiable": False, "literals": None, "resolution_time": delta_t}
+        literals = np.array(lines[2][2:].split(), dtype=np.int64)
+        return {"satisfiable": True, "literals": literals[literals != 0], "resolution_time": delta_t}
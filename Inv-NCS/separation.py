@@ -0,0 +1,71 @@
+"""
+SAT formulation of Inv-NCS based on the separation of pairs of alternatives.
+Unlike the coalitions formulation (see sat.py), it has no variable per coalition of criteria,
+so its size is polynomial in the number of criteria and quadratic in the number of alternatives.
+see paper https://www.researchgate.net/publication/354003148_Learning_Non-Compensatory_Sorting_models_using_efficient_SATMaxSAT_formulations
+paragraph 4.2. A SAT formulation for Inv-NCS based on separation
+"""
+
+import numpy as np
+from sat import SATSolver
+from itertools import chain
+from dimacs import DimacsWriter
+from encoding import VariableLayout, clauses_c1, clauses_c2
+from data_generator import minimal_coalitions, coalitions_levels
+
+
+class SeparationSATSolver(SATSolver):
+    def build_model(self):
+        self.n = len(self.data.columns) - 1
+        self.p = p = max(self.data["class"]) + 1  # = len(profiles) + 1
+
+        # marks of the instances (instances x criteria) and their classes
+        self.X = X = self.data.iloc[:, : self.n].to_numpy()
+        self.classes = classes = self.data["class"].to_numpy()
+
+        # x[i,h,k] positive means the mark k validates the criterion i wrt the profile b_h
+        self.layout = layout = VariableLayout(X, p, coalitions=False)
+        self.y_vars_start = layout.n_x  # the x variables are the only ones decoded as profiles
+
+        # pairs (a, b) where a must be separated from b: a is assigned to a better class than b
+        self.pairs_a, self.pairs_b = pairs_a, pairs_b = np.nonzero(classes[:, None] > classes[None, :])
+
+        # s[i,a,b] positive if the criterion i separates a from b: a validates i at the level of its class,
+        # and b doesnt validate i at the level just above its class. s[i, pair] = s_offset + pair * n + i
+        self.s_offset = layout.numvar + 1
+        s = self.s_offset + np.arange(len(pairs_a) * self.n).reshape(len(pairs_a), self.n)
+
+        # the blocks of clauses are written as they are generated, the formula is not kept in memory
+        with DimacsWriter(self.dimacs_file, layout.numvar + s.size) as writer:
+            for block in chain(clauses_c1(layout, self.c1_encoding), clauses_c2(layout)):
+                writer.write_block(block)
+
+            # the criteria validated by a at the level of its class can not all be validated by b at the level just
+            # above its class, otherwise no upward-closed (and nested) family of sufficient coalitions could sort
+            # both. The other pairs of levels are implied by C2.
+            h, hp = classes[pairs_a], classes[pairs_b] + 1
+            writer.write_block(s)
+            for i in range(self.n):
+                writer.write_block(np.column_stack([-s[:, i], layout.x(i, h, layout.ranks[pairs_a, i])]))
+                writer.write_block(np.column_stack([-s[:, i], -layout.x(i, hp, layout.ranks[pairs_b, i])]))
+
+    def _decode_variable(self, var):
+        if var < self.s_offset:
+            return self.layout.decode(var)
+        # tagged, as (i, a, b) could equal the (i, h, mark) key of an x variable
+        pair, i = divmod(var - self.s_offset, self.n)
+        return ("s", i, self.data.index[self.pairs_a[pair]], self.data.index[self.pairs_b[pair]])
+
+    def _sufficient_coalitions(self, variables):
+        # The coalition validated by a student at the level of its class is sufficient at this level and below.
+        # Only the minimal ones are kept, their supersets are sufficient as well.
+        if not variables:
+            return {}
+        validated = np.zeros((len(self.classes), self.n), dtype=bool)  # criteria validated at the level of the class
+        for u in np.flatnonzero(self.classes > 0):
+            validated[u] = [variables[(i, self.classes[u], self.X[u, i])] for i in range(self.n)]
+        masks = (validated * np.left_shift(1, np.arange(self.n))).sum(axis=1)
+        sufficient = np.zeros((self.p - 1, 1 << self.n), dtype=bool)
+        levels, students = np.nonzero(np.arange(1, self.p)[:, None] <= self.classes[None, :])
+        sufficient[levels, masks[students]] = True
+        return coalitions_levels(minimal_coalitions(sufficient))  # {B: [h where B is minimal sufficient at level h]}
@@ -0,0 +1,81 @@
+"""
+Content-addressed cache of the gophersat resolutions, kept on disk.
+A resolution is keyed by the hash of the DIMACS file, the gophersat binary and its flags, and stores the raw
+result (variable values by id, never decoded, as the same formula can encode different marks) and its timing.
+The least recently used entries are evicted once the cache exceeds its size.
+"""
+
+import os
+import pickle
+import hashlib
+import tempfile
+
+CHUNK_SIZE = 1 << 20  # bytes hashed at once
+
+
+class SolveCache:
+    """
+    Arguments:
+        directory: str -- directory of the cache, created on the first entry
+        max_bytes: int -- size of the cache on disk above which the least recently used entries are evicted
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def key(self, filename, cmd, flags=()):
+        """
+        Returns the key of the resolution of the file `filename` by the binary `cmd` called with `flags`.
+        The name of the binary holds its version, e.g. gophersat-1.3.1.
+        """
+        digest = hashlib.sha256()
+        digest.update(" ".join([os.path.basename(cmd), *flags]).encode() + b"\0")
+        with open(filename, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".pkl")
+
+    def get(self, key):
+        """
+        Returns the result stored for `key`, or None.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                result = pickle.load(f)
+            os.utime(path)  # most recently used
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return result
+
+    def put(self, key, result):
+        """
+        Stores the result for `key`, then evicts the least recently used entries if the cache is too big.
+        The entry is written to a temporary file and renamed, so concurrent resolutions never read partial entries.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        descriptor, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(descriptor, "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pkl"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:  # already evicted by a concurrent resolution
+                pass
+            size -= entry_size
@@ -0,0 +1,35 @@
+"""
+The chain and pairwise encodings of the C1 clauses must give the same optimum.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+import pytest
+import config
+from data_generator import generate_data
+from maxsat import MaxSATSolver
+from sat import SATSolver
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_chain_and_pairwise_encodings_have_the_same_optimum(seed):
+    np.random.seed(seed)
+    params = config.get_random_params(n=4, p=3, n_learning_set=60, mu=0.1)
+    _, learning_data, correct_learning_data = generate_data(params, save=False)
+
+    costs = []
+    for c1_encoding in ["chain", "pairwise"]:
+        solver = MaxSATSolver(learning_data, None, c1_encoding=c1_encoding, cache_dir=None)
+        sol = solver.solve(save_solution=False, verbose=False)
+        assert sol["optimal"]
+        costs.append(sol["cost"])
+    assert costs[0] == costs[1]
+
+    correct_learning_data["is_mistake"] = False
+    for c1_encoding in ["chain", "pairwise"]:
+        solver = SATSolver(correct_learning_data, None, c1_encoding=c1_encoding, cache_dir=None)
+        assert solver.solve(save_solution=False)["satisfiable"]
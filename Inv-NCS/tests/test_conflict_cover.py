@@ -0,0 +1,33 @@
+"""
+conflict_cover must return a minimum vertex cover of the dominance conflicts, checked by brute force on tiny inputs.
+"""
+
+import os
+import sys
+from itertools import combinations
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+import pytest
+from preprocessing import conflict_cover, dominance_conflicts
+
+
+def minimum_cover_size(m, conflicts):
+    for size in range(m + 1):
+        for cover in combinations(range(m), size):
+            if all(a in cover or b in cover for a, b in conflicts):
+                return size
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_conflict_cover_is_a_minimum_vertex_cover(seed):
+    rng = np.random.default_rng(seed)
+    m = int(rng.integers(2, 10))
+    X = rng.integers(0, 3, size=(m, 2)).astype(float)
+    classes = rng.integers(0, 3, size=m)
+
+    conflicts = list(zip(*dominance_conflicts(X, classes)))
+    cover = set(conflict_cover(X, classes).tolist())
+    assert all(a in cover or b in cover for a, b in conflicts)
+    assert len(cover) == minimum_cover_size(m, conflicts)
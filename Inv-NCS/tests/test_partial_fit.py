@@ -0,0 +1,29 @@
+"""
+Adding reference assignments with partial_fit must give the same optimum as learning all of them at once.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+import pytest
+import config
+from data_generator import generate_data
+from maxsat import MaxSATSolver
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_partial_fit_has_the_optimum_of_the_concatenated_learning_set(seed):
+    np.random.seed(seed)
+    params = config.get_random_params(n=4, p=3, n_learning_set=60, mu=0.1)
+    _, learning_data, _ = generate_data(params, save=False)
+
+    solver = MaxSATSolver(learning_data.iloc[:40], None, cache_dir=None)
+    solver.solve(save_solution=False, verbose=False)
+    sol = solver.partial_fit(learning_data.iloc[40:], save_solution=False, verbose=False)
+    full_sol = MaxSATSolver(learning_data, None, cache_dir=None).solve(save_solution=False, verbose=False)
+
+    assert sol["optimal"] and full_sol["optimal"]
+    assert sol["cost"] == full_sol["cost"]
@@ -0,0 +1,30 @@
+"""
+The separation formulation must decode a model consistent with noise-free learning data.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+import pytest
+import config
+from data_generator import generate_data, sufficiency_table, ncs_classes
+from separation import SeparationSATSolver
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_noise_free_learning_data_is_classified_without_errors(seed):
+    # with seed 2, some marks are clipped to 20.0, whose x variable keys could be shadowed by s variables
+    np.random.seed(seed)
+    params = config.get_random_params(n=5, p=3, n_learning_set=120, mu=0.0)
+    _, learning_data, _ = generate_data(params, save=False)
+    solver = SeparationSATSolver(learning_data, None, gophersat_path=config.gophersat_path, cache_dir=None)
+    sol = solver.solve(save_solution=False)
+
+    assert sol["satisfiable"]
+    X = learning_data.iloc[:, : solver.n].to_numpy(dtype=float)
+    profiles = np.array([[(h_min + h_max) / 2 for h_min, h_max in profile] for profile in sol["profiles_intervals"]])
+    table = sufficiency_table(sol["sufficient_coalitions"], solver.n, solver.p - 1)
+    assert np.array_equal(ncs_classes(X, profiles, table), learning_data["class"].to_numpy())